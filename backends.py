@@ -0,0 +1,827 @@
+"""
+Phantom Keys - Output Backends
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Optional, TextIO
+
+
+# Backend Interface
+
+
+class CharRoute:
+    """How a backend delivers a written character; decided once per character."""
+
+    KEY = "key"  # a key of the current keyboard layout
+    REMAP = "remap"  # a spare key temporarily mapped to the character
+    PASTE = "paste"  # inserted from the clipboard, a run of characters at a time
+    DROP = "drop"  # no way to deliver it
+
+
+# Characters typed with Shift on a US layout, which pyautogui assumes too,
+# and the key that types each of them.
+SHIFTED_SYMBOLS = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+
+
+# The presses that make each navigation jump, as (modifier, key) pairs; an
+# empty modifier presses the key alone. "home" and "end" go to the ends of
+# the document, "up" to the start of the paragraph, or of the previous one
+# when already there, "down" to the start of the next paragraph and "left"
+# to the start of the word, or of the previous one when already there.
+CTRL_NAVIGATION: dict[str, tuple[tuple[str, str], ...]] = {
+    "home": (("ctrl", "home"),),
+    "end": (("ctrl", "end"),),
+    "up": (("ctrl", "up"),),
+    "down": (("ctrl", "down"),),
+    "left": (("ctrl", "left"),),
+}
+# macOS text views go to the ends of the document with Command+Up and
+# Command+Down, and to the ends of the current paragraph with Ctrl+A and
+# Ctrl+E, so one arrow press before or after reaches the neighbouring one.
+MAC_NAVIGATION: dict[str, tuple[tuple[str, str], ...]] = {
+    "home": (("command", "up"),),
+    "end": (("command", "down"),),
+    "up": (("", "left"), ("ctrl", "a")),
+    "down": (("ctrl", "e"), ("", "right")),
+    "left": (("option", "left"),),
+}
+
+
+def needs_shift(char: str) -> bool:
+    """Whether typing a character on a US layout takes Shift."""
+    return char in SHIFTED_SYMBOLS or (char.isascii() and char.isupper())
+
+
+class OutputBackend:
+    """
+    Destination for the keystrokes produced by the typing engine.
+
+    The engine only ever calls these methods, so any backend can stand in
+    for a real keyboard: ``write`` types one printable character, ``press``
+    taps a named key, ``key_down``/``key_up`` hold and release modifiers,
+    and ``flush`` marks the end of one scheduled event group.
+
+    Backends that cannot type every character classify each one once into
+    a ``CharRoute``, count how many went each way in ``route_counts``, and
+    may hold characters back across event groups until ``drain``.
+
+    With ``coalesce_shift``, a backend holds Shift across a run of shifted
+    characters instead of pressing it for each one, and releases it before
+    any other key and on ``drain``. ``key_events`` counts the key down and
+    up events a backend has injected.
+
+    Backends that only count or record keystrokes set ``injects_input`` to
+    False, so they are never sent calibration keys.
+
+    ``navigate`` makes the jumps of ``NAVIGATION``, which backends that
+    inject into another platform's editors replace with its shortcuts.
+    """
+
+    name = "base"
+    coalesce_shift = False
+    key_events = 0
+    injects_input = True
+    NAVIGATION = CTRL_NAVIGATION
+
+    def write(self, char: str) -> None:
+        """Type a single printable character."""
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        """Tap a named key such as ``backspace`` or ``enter``."""
+        raise NotImplementedError
+
+    def key_down(self, key: str) -> None:
+        """Hold down a key, typically a modifier."""
+        raise NotImplementedError
+
+    def key_up(self, key: str) -> None:
+        """Release a previously held key."""
+        raise NotImplementedError
+
+    def navigate(self, key: str) -> None:
+        """Jump with a navigation key, e.g. ``home`` to the start of the document."""
+        for modifier, pressed in self.NAVIGATION[key]:
+            if modifier:
+                self.key_down(modifier)
+                self.press(pressed)
+                self.key_up(modifier)
+            else:
+                self.press(pressed)
+
+    def flush(self) -> None:
+        """Deliver any buffered input for the current event group."""
+
+    def drain(self) -> None:
+        """Deliver held back characters, such as a paste run, and release Shift."""
+
+    def route_counts(self) -> dict[str, int]:
+        """Characters written so far per ``CharRoute``; empty if all are typed as keys."""
+        return {}
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+
+    @property
+    def display(self) -> str:
+        """Identifier of the display this backend injects into."""
+        return os.environ.get("DISPLAY", "default")
+
+    @property
+    def implicit_pause(self) -> float:
+        """Delay the backend adds after every call on its own, in seconds."""
+        return 0.0
+
+
+class PyAutoGUIBackend(OutputBackend):
+    """
+    Injects keystrokes through pyautogui, with its implicit PAUSE disabled.
+
+    pyautogui only types characters in its key map and silently skips the
+    rest. Those, such as accented letters, curly quotes or CJK, are pasted
+    from the clipboard instead: a run of them is collected and pasted in
+    one go when the next key is typed or the session ends. The clipboard
+    is restored on ``close``. Without pyperclip they are dropped.
+
+    Shift is held across runs of capital letters, except on macOS, where
+    pyautogui does not apply a held Shift to later keys. Shifted symbols
+    are left to pyautogui, which finds their key on the actual layout.
+    Navigation and paste use the macOS shortcuts there.
+    """
+
+    name = "pyautogui"
+
+    PASTE_MODIFIER = "command" if sys.platform == "darwin" else "ctrl"
+    NAVIGATION = MAC_NAVIGATION if sys.platform == "darwin" else CTRL_NAVIGATION
+    # Time the target application gets to read a paste before the old
+    # clipboard content is put back.
+    CLIPBOARD_SETTLE = 0.2
+
+    def __init__(self, coalesce_shift: bool = sys.platform != "darwin") -> None:
+        """Import pyautogui and switch off its per-call pause."""
+        import pyautogui  # type: ignore[import-untyped]
+
+        try:
+            import pyperclip  # type: ignore[import-untyped]
+        except ImportError:
+            pyperclip = None
+
+        self._pyautogui = pyautogui
+        self._pyperclip = pyperclip
+        self._implicit_pause = float(pyautogui.PAUSE)
+        pyautogui.PAUSE = 0
+        self.coalesce_shift = coalesce_shift
+        self.key_events = 0
+        self._shift_latched = False
+        self._routes: dict[str, str] = {}
+        # Key to write, whether it takes the held Shift, and whether pyautogui
+        # presses Shift around it itself, for characters typed as keys.
+        self._keys: dict[str, tuple[str, bool, bool]] = {}
+        self._counts: dict[str, int] = dict.fromkeys(
+            (CharRoute.KEY, CharRoute.PASTE, CharRoute.DROP), 0
+        )
+        self._pending: list[str] = []
+        self._saved_clipboard: Optional[str] = None
+        self._pasted_at = 0.0
+
+    @property
+    def implicit_pause(self) -> float:
+        """The pyautogui.PAUSE value that was in effect before it was disabled."""
+        return self._implicit_pause
+
+    def _route(self, char: str) -> str:
+        """Decide, once per character, how it is delivered."""
+        if char.isascii() and (char.isprintable() or char in "\n\t"):
+            route = CharRoute.KEY
+        elif self._pyautogui.isValidKey(char):
+            route = CharRoute.KEY
+        elif self._pyperclip is not None:
+            route = CharRoute.PASTE
+        else:
+            route = CharRoute.DROP
+        if route == CharRoute.KEY:
+            # Letters are the only characters whose base key is the same on
+            # every layout; the US symbol table would type the wrong ones.
+            latched = self.coalesce_shift and char.isascii() and char.isupper()
+            wrapped = needs_shift(char) and not latched
+            self._keys[char] = (char.lower() if latched else char, latched, wrapped)
+        self._routes[char] = route
+        return route
+
+    def _latch_shift(self, down: bool) -> None:
+        """Hold Shift down for the keys that follow, or let it go."""
+        if down:
+            self._pyautogui.keyDown("shift")
+        else:
+            self._pyautogui.keyUp("shift")
+        self._shift_latched = down
+        self.key_events += 1
+
+    def _paste(self) -> None:
+        """Paste the pending run of characters through the clipboard."""
+        if self._shift_latched:
+            self._latch_shift(False)
+        text = "".join(self._pending)
+        self._pending.clear()
+        pyperclip = self._pyperclip
+        try:
+            if self._saved_clipboard is None:
+                self._saved_clipboard = pyperclip.paste()
+            pyperclip.copy(text)
+        except pyperclip.PyperclipException:
+            # No clipboard mechanism on this system: stop trying.
+            self._pyperclip = None
+            self._routes = {
+                char: CharRoute.DROP if route == CharRoute.PASTE else route
+                for char, route in self._routes.items()
+            }
+            self._counts[CharRoute.PASTE] -= len(text)
+            self._counts[CharRoute.DROP] += len(text)
+            return
+        self._pyautogui.hotkey(self.PASTE_MODIFIER, "v")
+        self._pasted_at = time.perf_counter()
+        self.key_events += 4
+
+    def _before_key(self) -> None:
+        """Paste a pending run and release a held Shift before another key."""
+        if self._pending:
+            self._paste()
+        if self._shift_latched:
+            self._latch_shift(False)
+
+    def write(self, char: str) -> None:
+        """Type a single character, or queue it for the next paste."""
+        route = self._routes.get(char) or self._route(char)
+        self._counts[route] += 1
+        if route == CharRoute.KEY:
+            if self._pending:
+                self._paste()
+            key, latched, wrapped = self._keys[char]
+            if latched != self._shift_latched:
+                self._latch_shift(latched)
+            self._pyautogui.write(key, interval=0)
+            # pyautogui wraps a shifted key in its own Shift press.
+            self.key_events += 2 + 2 * wrapped
+        elif route == CharRoute.PASTE:
+            self._pending.append(char)
+
+    def press(self, key: str) -> None:
+        """Tap a named key."""
+        self._before_key()
+        self._pyautogui.press(key)
+        self.key_events += 2
+
+    def key_down(self, key: str) -> None:
+        """Hold down a key."""
+        self._before_key()
+        self._pyautogui.keyDown(key)
+        self.key_events += 1
+
+    def key_up(self, key: str) -> None:
+        """Release a key."""
+        self._before_key()
+        self._pyautogui.keyUp(key)
+        self.key_events += 1
+
+    def drain(self) -> None:
+        """Paste a run of characters that is still pending and release Shift."""
+        self._before_key()
+
+    def route_counts(self) -> dict[str, int]:
+        """Characters typed as keys, pasted and dropped so far."""
+        return dict(self._counts)
+
+    def close(self) -> None:
+        """Paste anything pending and give the clipboard its old content back."""
+        self.drain()
+        if self._saved_clipboard is not None and self._pyperclip is not None:
+            settle = self._pasted_at + self.CLIPBOARD_SETTLE - time.perf_counter()
+            if settle > 0:
+                time.sleep(settle)
+            self._pyperclip.copy(self._saved_clipboard)
+            self._saved_clipboard = None
+
+
+class XTestBackend(OutputBackend):
+    """
+    Injects keystrokes straight into an X server through the XTest extension.
+
+    The keysym to keycode table is read once when the backend is created.
+    Key presses and releases are only queued on the connection and go out
+    together, with a single flush, when the engine finishes an event group.
+    Works against any X display, including Xvfb.
+
+    Characters missing from the keyboard layout are typed through a few
+    spare keycodes, each temporarily mapped to the character's keysym and
+    reused for the most recently needed ones. ``close`` unmaps them again.
+    Shift is held across runs of keys on the shifted level.
+    """
+
+    name = "xtest"
+
+    NAMED_KEYSYMS: dict[str, str] = {
+        "backspace": "BackSpace",
+        "enter": "Return",
+        "return": "Return",
+        "space": "space",
+        "tab": "Tab",
+        "shift": "Shift_L",
+        "shiftleft": "Shift_L",
+        "shiftright": "Shift_R",
+        "ctrl": "Control_L",
+        "ctrlleft": "Control_L",
+        "alt": "Alt_L",
+        "left": "Left",
+        "right": "Right",
+        "up": "Up",
+        "down": "Down",
+        "home": "Home",
+        "end": "End",
+        "delete": "Delete",
+        "esc": "Escape",
+    }
+
+    # Spare keycodes borrowed for characters missing from the layout.
+    REMAP_KEYCODES = 8
+
+    def __init__(
+        self, display: Optional[str] = None, sync: bool = True, coalesce_shift: bool = True
+    ) -> None:
+        """
+        Connect to an X display and cache its keyboard mapping.
+
+        With ``sync`` enabled each flush waits for the server to process the
+        queued requests, so a returned flush means the keys were injected.
+        """
+        from Xlib import X, XK  # type: ignore[import-untyped]
+        from Xlib import display as xdisplay
+        from Xlib.ext import xtest  # type: ignore[import-untyped]
+
+        self._display_name = display or os.environ.get("DISPLAY", ":0")
+        self._conn = xdisplay.Display(self._display_name)
+        if not self._conn.has_extension("XTEST"):
+            raise RuntimeError(f"X display {self._display_name} has no XTEST extension")
+
+        self._xk = XK
+        self._fake_input = xtest.fake_input
+        self._key_press = X.KeyPress
+        self._key_release = X.KeyRelease
+        self._sync = sync
+        self.coalesce_shift = coalesce_shift
+        self.key_events = 0
+        self._shift_latched = False
+        self._spare_keycodes: list[tuple[int, tuple[int, ...]]] = []
+        self._keycodes = self._read_keyboard_mapping()
+        self._shift_keycode = self._keycodes[XK.string_to_keysym("Shift_L")][0]
+        self._shift_held = False
+        self._key_cache: dict[str, Optional[tuple[int, bool]]] = {}
+        self._routes: dict[str, str] = {}
+        self._counts: dict[str, int] = dict.fromkeys(
+            (CharRoute.KEY, CharRoute.REMAP, CharRoute.DROP), 0
+        )
+        self._remapped: OrderedDict[int, int] = OrderedDict()
+
+    def _read_keyboard_mapping(self) -> dict[int, tuple[int, bool]]:
+        """
+        Map every keysym on the keyboard to its keycode and shift level.
+
+        Keycodes without any keysym are set aside, with their original
+        entries, as spares for remapping.
+        """
+        first = self._conn.display.info.min_keycode
+        count = self._conn.display.info.max_keycode - first + 1
+        mapping = self._conn.get_keyboard_mapping(first, count)
+
+        keycodes: dict[int, tuple[int, bool]] = {}
+        for level in (0, 1):
+            for index, keysyms in enumerate(mapping):
+                if level < len(keysyms) and keysyms[level]:
+                    keycodes.setdefault(keysyms[level], (first + index, level == 1))
+        for index, keysyms in enumerate(mapping):
+            if len(self._spare_keycodes) == self.REMAP_KEYCODES:
+                break
+            if not any(keysyms):
+                self._spare_keycodes.append((first + index, tuple(keysyms)))
+        return keycodes
+
+    def _keysym(self, key: str) -> int:
+        """Resolve a character or pyautogui-style key name to a keysym."""
+        named = self.NAMED_KEYSYMS.get(key.lower()) if len(key) > 1 else None
+        if named is not None:
+            return self._xk.string_to_keysym(named)
+        if key == "\n":
+            return self._xk.string_to_keysym("Return")
+        if key == "\t":
+            return self._xk.string_to_keysym("Tab")
+        if len(key) == 1:
+            codepoint = ord(key)
+            return codepoint if codepoint < 0x100 else 0x01000000 | codepoint
+        return self._xk.string_to_keysym(key)
+
+    def _lookup(self, key: str) -> Optional[tuple[int, bool]]:
+        """Return the cached keycode and shift requirement for a key."""
+        try:
+            return self._key_cache[key]
+        except KeyError:
+            entry = self._keycodes.get(self._keysym(key))
+            self._key_cache[key] = entry
+            return entry
+
+    def _inject(self, event_type: int, keycode: int) -> None:
+        """Queue one key event."""
+        self._fake_input(self._conn, event_type, keycode)
+        self.key_events += 1
+
+    def _latch_shift(self, down: bool) -> None:
+        """Hold Shift down for the keys that follow, or let it go."""
+        self._inject(self._key_press if down else self._key_release, self._shift_keycode)
+        self._shift_latched = down
+
+    def _tap(self, key: str) -> None:
+        """Queue a press/release pair, with Shift held when needed."""
+        entry = self._lookup(key)
+        if entry is None:
+            return
+        keycode, shifted = entry
+        wrap_shift = False
+        if self._shift_held:
+            pass
+        elif self.coalesce_shift:
+            if shifted != self._shift_latched:
+                self._latch_shift(shifted)
+        else:
+            wrap_shift = shifted
+        if wrap_shift:
+            self._inject(self._key_press, self._shift_keycode)
+        self._inject(self._key_press, keycode)
+        self._inject(self._key_release, keycode)
+        if wrap_shift:
+            self._inject(self._key_release, self._shift_keycode)
+
+    def _route(self, char: str) -> str:
+        """Decide, once per character, how it is delivered."""
+        if self._lookup(char) is not None:
+            route = CharRoute.KEY
+        elif self._spare_keycodes:
+            route = CharRoute.REMAP
+        else:
+            route = CharRoute.DROP
+        self._routes[char] = route
+        return route
+
+    def _tap_remapped(self, char: str) -> None:
+        """Queue a tap of a spare keycode mapped to the character's keysym."""
+        keysym = self._keysym(char)
+        keycode = self._remapped.get(keysym)
+        if keycode is None:
+            if len(self._remapped) < len(self._spare_keycodes):
+                keycode = self._spare_keycodes[len(self._remapped)][0]
+            else:
+                _, keycode = self._remapped.popitem(last=False)
+            # The same keysym on both shift levels, so a held Shift is harmless.
+            self._conn.change_keyboard_mapping(keycode, [(keysym, keysym)])
+            # Clients must get the new mapping before the key press arrives.
+            self._conn.sync()
+            self._remapped[keysym] = keycode
+        else:
+            self._remapped.move_to_end(keysym)
+        self._inject(self._key_press, keycode)
+        self._inject(self._key_release, keycode)
+
+    def write(self, char: str) -> None:
+        """Queue a single character."""
+        route = self._routes.get(char) or self._route(char)
+        self._counts[route] += 1
+        if route == CharRoute.KEY:
+            self._tap(char)
+        elif route == CharRoute.REMAP:
+            self._tap_remapped(char)
+
+    def press(self, key: str) -> None:
+        """Queue a tap of a named key."""
+        self._tap(key)
+
+    def key_down(self, key: str) -> None:
+        """Queue a key down, releasing a Shift held for earlier keys first."""
+        if self._shift_latched:
+            self._latch_shift(False)
+        entry = self._lookup(key)
+        if entry is not None:
+            self._inject(self._key_press, entry[0])
+            if entry[0] == self._shift_keycode:
+                self._shift_held = True
+
+    def key_up(self, key: str) -> None:
+        """Queue a key up, releasing a Shift held for earlier keys first."""
+        if self._shift_latched:
+            self._latch_shift(False)
+        entry = self._lookup(key)
+        if entry is not None:
+            self._inject(self._key_release, entry[0])
+            if entry[0] == self._shift_keycode:
+                self._shift_held = False
+
+    def flush(self) -> None:
+        """Send the queued requests to the X server in one go."""
+        if self._sync:
+            self._conn.sync()
+        else:
+            self._conn.flush()
+
+    def drain(self) -> None:
+        """Release a Shift held for earlier keys."""
+        if self._shift_latched:
+            self._latch_shift(False)
+
+    def route_counts(self) -> dict[str, int]:
+        """Characters typed as keys, through remapped keys and dropped so far."""
+        return dict(self._counts)
+
+    def close(self) -> None:
+        """Release Shift, restore the borrowed keycodes and close the X connection."""
+        self.drain()
+        self.flush()
+        if self._remapped:
+            for keycode, keysyms in self._spare_keycodes:
+                self._conn.change_keyboard_mapping(keycode, [keysyms])
+            self._conn.sync()
+            self._remapped.clear()
+        self._conn.close()
+
+    @property
+    def display(self) -> str:
+        """The X display name this backend is connected to."""
+        return self._display_name
+
+
+class NullBackend(OutputBackend):
+    """
+    Discards every keystroke; used to measure engine throughput.
+
+    ``key_events`` counts the key events a US keyboard would have needed,
+    so the effect of ``coalesce_shift`` can be measured without a display.
+    Like the pyautogui backend, it holds Shift only across capital letters
+    and presses it around each shifted symbol.
+    """
+
+    name = "null"
+    injects_input = False
+
+    def __init__(self, coalesce_shift: bool = True) -> None:
+        """Initialize the event counters."""
+        self.event_count = 0
+        self.key_events = 0
+        self.coalesce_shift = coalesce_shift
+        self._shift_latched = False
+
+    def write(self, char: str) -> None:
+        """Count and discard a character."""
+        self.event_count += 1
+        latched = self.coalesce_shift and char.isascii() and char.isupper()
+        if latched != self._shift_latched:
+            self._shift_latched = latched
+            self.key_events += 1
+        self.key_events += 4 if needs_shift(char) and not latched else 2
+
+    def _release_shift(self) -> None:
+        """Count the release of a Shift held for earlier keys."""
+        if self._shift_latched:
+            self._shift_latched = False
+            self.key_events += 1
+
+    def press(self, key: str) -> None:
+        """Count and discard a key press."""
+        self.event_count += 1
+        self._release_shift()
+        self.key_events += 2
+
+    def key_down(self, key: str) -> None:
+        """Count and discard a key down."""
+        self.event_count += 1
+        self._release_shift()
+        self.key_events += 1
+
+    def key_up(self, key: str) -> None:
+        """Count and discard a key up."""
+        self.event_count += 1
+        self._release_shift()
+        self.key_events += 1
+
+    def drain(self) -> None:
+        """Count the release of a Shift still held."""
+        self._release_shift()
+
+    @property
+    def display(self) -> str:
+        """The null backend has no display."""
+        return "null"
+
+
+class RecordedEvent(NamedTuple):
+    """A keystroke captured by the recording backend."""
+
+    time: float
+    kind: str
+    key: str
+
+
+class RecordingBackend(OutputBackend):
+    """
+    Captures keystrokes with timestamps instead of injecting them.
+
+    Events are kept in memory and, if a file is given, also appended to it
+    as JSON lines on every flush.
+    """
+
+    name = "recording"
+    injects_input = False
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """Initialize an empty recording, optionally mirrored to a file."""
+        self.events: list[RecordedEvent] = []
+        self._start = time.perf_counter()
+        self._file: Optional[TextIO] = open(path, "w", encoding="utf-8") if path else None
+        self._written = 0
+
+    def _record(self, kind: str, key: str) -> None:
+        """Append one timestamped event."""
+        self.events.append(RecordedEvent(time.perf_counter() - self._start, kind, key))
+
+    def write(self, char: str) -> None:
+        """Record a typed character."""
+        self._record("write", char)
+
+    def press(self, key: str) -> None:
+        """Record a key press."""
+        self._record("press", key)
+
+    def key_down(self, key: str) -> None:
+        """Record a key down."""
+        self._record("down", key)
+
+    def key_up(self, key: str) -> None:
+        """Record a key up."""
+        self._record("up", key)
+
+    def flush(self) -> None:
+        """Append events recorded since the last flush to the file."""
+        if self._file is None:
+            return
+        for event in self.events[self._written :]:
+            self._file.write(json.dumps(event._asdict()) + "\n")
+        self._written = len(self.events)
+
+    def close(self) -> None:
+        """Flush and close the recording file."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    TYPED_KEYS = {"space": " ", "enter": "\n", "tab": "\t"}
+
+    def text(self) -> str:
+        """
+        Reconstruct the text the recorded keystrokes would produce.
+
+        Keys act like in a word processor: arrows move the cursor, Home and
+        End go to the start and end of the line, or of the whole text with
+        Ctrl held, Ctrl+Up and Ctrl+Down go to the start of the paragraph
+        and of the next one, Ctrl+Left to the start of the word, and Delete
+        removes the character after the cursor.
+        """
+        output: list[str] = []
+        cursor = 0
+        ctrl = False
+        for event in self.events:
+            kind, key = event.kind, event.key
+            if kind == "down" or kind == "up":
+                if key == "ctrl":
+                    ctrl = kind == "down"
+                continue
+            typed = key if kind == "write" else self.TYPED_KEYS.get(key)
+            if typed is not None:
+                output.insert(cursor, typed)
+                cursor += 1
+            elif key == "backspace":
+                if cursor:
+                    cursor -= 1
+                    del output[cursor]
+            elif key == "delete":
+                del output[cursor : cursor + 1]
+            elif key == "left" and ctrl:
+                while cursor and output[cursor - 1].isspace():
+                    cursor -= 1
+                if cursor and not output[cursor - 1].isalnum():
+                    cursor -= 1
+                else:
+                    while cursor and output[cursor - 1].isalnum():
+                        cursor -= 1
+            elif key == "left":
+                cursor = max(cursor - 1, 0)
+            elif key == "right":
+                cursor = min(cursor + 1, len(output))
+            elif key == "home":
+                if ctrl:
+                    cursor = 0
+                while cursor and output[cursor - 1] != "\n":
+                    cursor -= 1
+            elif key == "end":
+                if ctrl:
+                    cursor = len(output)
+                while cursor < len(output) and output[cursor] != "\n":
+                    cursor += 1
+            elif key == "up" and ctrl:
+                if cursor:
+                    cursor -= 1
+                while cursor and output[cursor - 1] != "\n":
+                    cursor -= 1
+            elif key == "down" and ctrl:
+                while cursor < len(output) and output[cursor] != "\n":
+                    cursor += 1
+                cursor = min(cursor + 1, len(output))
+        return "".join(output)
+
+    @property
+    def display(self) -> str:
+        """The recording backend has no display."""
+        return "recording"
+
+
+BACKENDS: dict[str, type[OutputBackend]] = {
+    "pyautogui": PyAutoGUIBackend,
+    "xtest": XTestBackend,
+    "null": NullBackend,
+    "recording": RecordingBackend,
+}
+
+
+def create_backend(name: str, **options: Any) -> OutputBackend:
+    """Create an output backend by name."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend '{name}', choose from: {', '.join(BACKENDS)}"
+        ) from None
+    return backend_class(**options)
+
+
+# Calibration
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """Measured cost of injecting one key through a backend on a display."""
+
+    backend: str
+    display: str
+    call_overhead: float
+    implicit_pause: float
+    samples: int
+
+
+_CALIBRATIONS: dict[tuple[str, str], Calibration] = {}
+
+
+def calibrate_output(
+    backend: OutputBackend, samples: int = 20, force: bool = False
+) -> Calibration:
+    """
+    Measure the real per-call cost of key injection through a backend.
+
+    Harmless shift presses are timed and averaged, each flushed like one
+    event group during playback, so a backend whose flush is a round trip
+    pays for it in every sample. Results are cached per backend and display
+    for the rest of the session. Backends that do not inject input are not
+    measured and cost nothing.
+    """
+    if not backend.injects_input:
+        return Calibration(backend.name, backend.display, 0.0, backend.implicit_pause, 0)
+
+    cache_key = (backend.name, backend.display)
+    cached = _CALIBRATIONS.get(cache_key)
+    if cached is not None and not force:
+        return cached
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        backend.press("shift")
+        backend.flush()
+    call_overhead = (time.perf_counter() - start) / samples
+
+    calibration = Calibration(
+        backend.name, backend.display, call_overhead, backend.implicit_pause, samples
+    )
+    _CALIBRATIONS[cache_key] = calibration
+    return calibration
@@ -0,0 +1,453 @@
+"""
+Phantom Keys - Typing Engine Benchmark
+
+Runs the typing engine against the null and recording backends over
+synthetic corpora and writes the results as JSON, so runs from different
+commits can be compared. Needs no display.
+
+Usage: python benchmarks/bench_engine.py [--full] [--output FILE] [--compare FILE]
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import NullBackend, RecordingBackend  # noqa: E402
+from engine import (  # noqa: E402
+    KeyAction,
+    KeystrokePlan,
+    TypingEngine,
+    VirtualClock,
+    iter_tokens,
+)
+from tracing import percentile  # noqa: E402
+from update import build_update_plan  # noqa: E402
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog history version document typing "
+    "natural human pause keyboard layout paragraph sentence rhythm burst speed "
+    "fatigue correction error neighbor simulation engine realistic progress"
+).split()
+
+CORPORA: dict[str, tuple[int, int]] = {
+    # name: (approximate characters, words per paragraph)
+    "small": (2_000, 60),
+    "paragraphs": (200_000, 8),
+    "large": (4_000_000, 120),
+}
+
+# Slider extremes and defaults from the GUI: WPM, typo rate, variability.
+WPM_VALUES = (10, 55, 150)
+TYPO_VALUES = (0.0, 0.03, 0.20)
+VARIABILITY_VALUES = (0.0, 0.35, 0.50)
+BURST_VALUES = (False, True)
+DEFAULT_SETTINGS = (55, 0.03, 0.35, True)
+
+
+def make_corpus(size: int, words_per_paragraph: int, seed: int = 0) -> str:
+    """Generate deterministic prose with capitals, punctuation and paragraphs."""
+    rng = random.Random(seed)
+    paragraphs: list[str] = []
+    length = 0
+    while length < size:
+        words = [rng.choice(WORDS) for _ in range(words_per_paragraph)]
+        words[0] = words[0].capitalize()
+        for index in range(5, len(words), rng.randint(6, 14)):
+            words[index] += rng.choice(",.;!?")
+        paragraph = " ".join(words) + "."
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    return "\n".join(paragraphs)
+
+
+def make_source_corpus(size: int, seed: int = 0) -> str:
+    """Generate deterministic indented source code with blank lines and aligned comments."""
+    rng = random.Random(seed)
+    lines: list[str] = []
+    length = 0
+    while length < size:
+        name = "_".join(rng.sample(WORDS, 2))
+        block = [f"def {name}(self, {rng.choice(WORDS)}):"]
+        for _ in range(rng.randint(2, 8)):
+            depth = rng.randint(1, 3)
+            target, value = rng.sample(WORDS, 2)
+            statement = f"{target} = self.{value}({rng.randint(0, 99)})"
+            if rng.random() < 0.3:
+                statement = f"{statement:<40}# {rng.choice(WORDS)}"
+            block.append("    " * depth + statement)
+        block.append("")
+        lines.extend(block)
+        length += sum(len(line) + 1 for line in block)
+    return "\n".join(lines)
+
+
+def split_tokens(text: str) -> Iterator[str]:
+    """The split-based tokenizer: paragraphs on newlines, then words on whitespace."""
+    for index, paragraph in enumerate(text.split("\n")):
+        if index:
+            yield "\n"
+        yield from paragraph.split()
+
+
+def bench_tokenizer(text: str) -> dict[str, Any]:
+    """
+    Compare the single-pass tokenizer with the split-based one on the same text.
+
+    Tokens are consumed as they are produced, the way the planner uses them,
+    and ``exact_fraction`` is the share of the text each one reproduces.
+    """
+    results: dict[str, Any] = {"chars": len(text)}
+    tokenizers = {
+        "split": lambda: split_tokens(text),
+        "single_pass": lambda: (token for _, _, token in iter_tokens((text,))),
+    }
+    for name, tokenize in tokenizers.items():
+        start = time.perf_counter()
+        tokens = covered = 0
+        for token in tokenize():
+            tokens += 1
+            covered += len(token)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        for token in tokenize():
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if name == "split":
+            # Only one space is put back between words; indentation and
+            # repeated spaces are lost.
+            covered += sum(max(len(line.split()) - 1, 0) for line in text.split("\n"))
+        results[name] = {
+            "seconds": seconds,
+            "ns_per_char": seconds / max(len(text), 1) * 1e9,
+            "peak_bytes": peak,
+            "tokens": tokens,
+            "exact_fraction": covered / max(len(text), 1),
+        }
+    return results
+
+
+def settings_label(settings: tuple[int, float, float, bool]) -> str:
+    """Describe one settings combination."""
+    wpm, typo_rate, variability, burst = settings
+    return f"wpm={wpm} typo={typo_rate:g} var={variability:g} burst={int(burst)}"
+
+
+def bench_planning(
+    engine: TypingEngine, text: str, settings: tuple[int, float, float, bool]
+) -> tuple[KeystrokePlan, dict[str, float]]:
+    """Time plan generation and return the plan with its throughput."""
+    random.seed(1)
+    start = time.perf_counter()
+    plan = engine.build_plan(text, *settings)
+    seconds = time.perf_counter() - start
+    events = len(plan)
+    return plan, {
+        "plan_seconds": seconds,
+        "events": events,
+        "events_per_s": events / seconds if seconds > 0 else 0.0,
+        "ns_per_char": seconds / max(len(text), 1) * 1e9,
+        "planned_duration_s": plan.duration,
+    }
+
+
+def bench_playback_overhead(plan: KeystrokePlan) -> dict[str, float]:
+    """Play a plan on a virtual clock to isolate per-event engine cost."""
+    engine = TypingEngine(NullBackend(), VirtualClock())
+    start = time.perf_counter()
+    engine.play_plan(plan)
+    seconds = time.perf_counter() - start
+    return {
+        "playback_seconds": seconds,
+        "overhead_ns_per_event": seconds / max(len(plan), 1) * 1e9,
+    }
+
+
+def bench_dry_run(engine: TypingEngine, text: str) -> dict[str, float]:
+    """Time a dry run simulation of a text."""
+    random.seed(1)
+    start = time.perf_counter()
+    report = engine.dry_run(text, *DEFAULT_SETTINGS)
+    seconds = time.perf_counter() - start
+    return {
+        "dry_run_seconds": seconds,
+        "words_per_s": report.words / seconds if seconds > 0 else 0.0,
+    }
+
+
+def bench_seeded(engine: TypingEngine, text: str) -> dict[str, float]:
+    """Compare seeded planning with the scalar loop and with NumPy array operations."""
+    start = time.perf_counter()
+    scalar = engine.build_plan(text, *DEFAULT_SETTINGS, seed=1, vectorized=False)
+    scalar_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    vector = engine.build_plan(text, *DEFAULT_SETTINGS, seed=1)
+    vector_seconds = time.perf_counter() - start
+    if scalar != vector:
+        raise AssertionError("vectorised plan differs from the scalar plan")
+    return {
+        "scalar_seconds": scalar_seconds,
+        "vectorized_seconds": vector_seconds,
+        "speedup": scalar_seconds / vector_seconds if vector_seconds > 0 else 0.0,
+    }
+
+
+def bench_key_events(plan: KeystrokePlan) -> dict[str, float]:
+    """Count the key events a plan injects with Shift pressed per key and held across runs."""
+    counts = {}
+    for coalesce in (False, True):
+        engine = TypingEngine(NullBackend(coalesce), VirtualClock())
+        engine.play_plan(plan)
+        counts[coalesce] = engine.stats["key_events"]
+    return {
+        "per_key": counts[False],
+        "coalesced": counts[True],
+        "saving": counts[False] / counts[True] if counts[True] else 0.0,
+    }
+
+
+def revise(text: str, edits: int, seed: int = 0) -> str:
+    """Reword a few scattered words, as a light revision of a document would."""
+    rng = random.Random(seed)
+    words = text.split(" ")
+    for _ in range(edits):
+        index = rng.randrange(len(words))
+        words[index] = rng.choice(WORDS) + (" " + rng.choice(WORDS) if rng.random() < 0.5 else "")
+    return " ".join(words)
+
+
+def bench_update(engine: TypingEngine, text: str) -> dict[str, float]:
+    """Plan a light revision as an incremental update and compare it with a full retype."""
+    revised = revise(text, 10)
+    start = time.perf_counter()
+    _, update = build_update_plan(engine, text, revised, *DEFAULT_SETTINGS)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "keystrokes": update.keystrokes,
+        "full_keystrokes": update.full_keystrokes,
+        "keystroke_saving": update.keystroke_saving,
+        "time_saving": update.time_saving,
+    }
+
+
+def bench_async_sessions(sessions: int = 100) -> dict[str, float]:
+    """Run many short sessions concurrently on one event loop, in real time."""
+    text = make_corpus(40, 8, seed=2)
+    engines = [TypingEngine(NullBackend()) for _ in range(sessions)]
+
+    async def type_all() -> int:
+        await asyncio.gather(*(engine.type_text_async(text, 600) for engine in engines))
+        return threading.active_count()
+
+    random.seed(1)
+    start = time.perf_counter()
+    threads = asyncio.run(type_all())
+    seconds = time.perf_counter() - start
+    errors = [engine.timing["mean_error_ms"] for engine in engines]
+    return {
+        "sessions": sessions,
+        "threads": threads,
+        "wall_seconds": seconds,
+        "longest_session_s": max(engine.timing["elapsed_s"] for engine in engines),
+        "mean_error_ms": sum(errors) / len(errors),
+        "max_error_ms": max(engine.timing["max_error_ms"] for engine in engines),
+    }
+
+
+def bench_scheduling(engine: TypingEngine, plan: KeystrokePlan, seconds: float) -> dict[str, float]:
+    """Play the first ``seconds`` of a plan for real and compare planned and actual times."""
+    events = [event for event in plan if event.time <= seconds]
+    recorder = RecordingBackend()
+    engine.backend = recorder
+    engine.play_plan(KeystrokePlan.from_events(events, plan.total_chars))
+
+    first = recorder.events[0].time if recorder.events else 0.0
+    lateness = [
+        (recorded.time - first - event.time) * 1000
+        for event, recorded in zip(events, recorder.events)
+    ]
+    report = {key: value for key, value in engine.timing.items() if key.endswith("_ms")}
+    report.update(
+        {
+            "events": len(events),
+            "lateness_p50_ms": percentile(lateness, 0.50),
+            "lateness_p95_ms": percentile(lateness, 0.95),
+            "lateness_p99_ms": percentile(lateness, 0.99),
+            "lateness_max_ms": max(lateness, default=0.0),
+        }
+    )
+    return report
+
+
+def bench_memory(engine: TypingEngine, text: str) -> dict[str, float]:
+    """Measure planning memory and compare the compact plan with a tuple of events."""
+    random.seed(1)
+    tracemalloc.start()
+    plan = engine.build_plan(text, *DEFAULT_SETTINGS)
+    held, peak = tracemalloc.get_traced_memory()
+    naive = tuple(plan)
+    naive_held = tracemalloc.get_traced_memory()[0] - held
+    tracemalloc.stop()
+    del naive
+    events = max(len(plan), 1)
+    return {
+        "peak_bytes": peak,
+        "bytes_per_event": held / events,
+        "naive_bytes_per_event": naive_held / events,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Return the current commit hash, if the benchmark runs inside git."""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def run(full: bool, schedule_seconds: float) -> dict[str, Any]:
+    """Run every benchmark and collect the results."""
+    engine = TypingEngine(NullBackend())
+    grid = list(itertools.product(WPM_VALUES, TYPO_VALUES, VARIABILITY_VALUES, BURST_VALUES))
+    results: dict[str, Any] = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "corpora": {},
+    }
+
+    for name, (size, words_per_paragraph) in CORPORA.items():
+        text = make_corpus(size, words_per_paragraph)
+        print(f"{name}: {len(text):,} chars", file=sys.stderr, flush=True)
+
+        combos = grid if full or name != "large" else [DEFAULT_SETTINGS]
+        planning = {}
+        for settings in combos:
+            _, planning[settings_label(settings)] = bench_planning(engine, text, settings)
+
+        plan, default_planning = bench_planning(engine, text, DEFAULT_SETTINGS)
+        typed_chars = sum(1 for event in plan if event.action == KeyAction.CHAR)
+        results["corpora"][name] = {
+            "chars": len(text),
+            "typed_chars": typed_chars,
+            "default": default_planning,
+            "planning": planning,
+            "playback": bench_playback_overhead(plan),
+            "dry_run": bench_dry_run(engine, text),
+            "memory": bench_memory(engine, text),
+            "update": bench_update(engine, text),
+            "key_events": bench_key_events(plan),
+        }
+        if HAVE_NUMPY:
+            results["corpora"][name]["seeded"] = bench_seeded(engine, text)
+
+    source = make_source_corpus(CORPORA["paragraphs"][0])
+    print(f"tokenizer: {len(source):,} chars of source code", file=sys.stderr, flush=True)
+    results["tokenizer"] = bench_tokenizer(source)
+    headings = "\n\n".join(
+        f"{heading.upper()}\n{body}"
+        for heading, body in zip(
+            make_corpus(20_000, 4, seed=1).split("\n"), make_corpus(200_000, 30).split("\n")
+        )
+    )
+    random.seed(1)
+    results["key_events"] = {
+        "source": bench_key_events(engine.build_plan(source, *DEFAULT_SETTINGS)),
+        "headings": bench_key_events(engine.build_plan(headings, *DEFAULT_SETTINGS)),
+    }
+
+    random.seed(1)
+    fast_plan = engine.build_plan(make_corpus(*CORPORA["small"]), 150, 0.03, 0.35, True)
+    results["scheduling"] = bench_scheduling(engine, fast_plan, schedule_seconds)
+    results["async"] = bench_async_sessions()
+    return results
+
+
+def flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    flat: dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> None:
+    """Print the ratio of every metric present in both result sets."""
+    old = flatten(baseline.get("corpora", {}), "corpora")
+    new = flatten(current.get("corpora", {}), "corpora")
+    for section in ("tokenizer", "key_events", "scheduling", "async"):
+        old.update(flatten(baseline.get(section, {}), section))
+        new.update(flatten(current.get(section, {}), section))
+    for name in sorted(old.keys() & new.keys()):
+        if old[name]:
+            ratio = new[name] / old[name]
+            print(f"{name:80} {old[name]:>14.4g} -> {new[name]:>14.4g} ({ratio:.2f}x)")
+
+
+def main() -> None:
+    """Run the benchmarks, write JSON results and optionally compare them."""
+    parser = argparse.ArgumentParser(description="Benchmark the typing engine.")
+    parser.add_argument(
+        "--full", action="store_true", help="run the full settings grid on every corpus"
+    )
+    parser.add_argument("--output", default="-", help="JSON output file (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument(
+        "--schedule-seconds",
+        type=float,
+        default=3.0,
+        help="real-time playback used to measure scheduling error (default: 3)",
+    )
+    args = parser.parse_args()
+
+    results = run(args.full, args.schedule_seconds)
+    output = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(json.load(handle), results)
+
+
+if __name__ == "__main__":
+    main()
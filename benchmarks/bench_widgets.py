@@ -0,0 +1,110 @@
+"""
+Phantom Keys - Widget Rendering Benchmark
+
+Measures how many updates per second ProgressRing and ModernButton sustain
+with in-place item updates, compared with the previous delete-and-redraw
+rendering. Needs a display; an Xvfb display works.
+
+Usage: python benchmarks/bench_widgets.py [--updates N]
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import THEME, ModernButton, ProgressRing  # noqa: E402
+
+
+class LegacyProgressRing(ProgressRing):
+    """ProgressRing that deletes and recreates its items on every update."""
+
+    def _draw(self) -> None:
+        """Redraw the progress ring from scratch."""
+        self.delete("all")
+
+        padding = 4
+        x1, y1 = padding, padding
+        x2, y2 = self.ring_size - padding, self.ring_size - padding
+
+        self.create_arc(
+            x1, y1, x2, y2, start=90, extent=-360,
+            outline=THEME.bg_tertiary, width=self.thickness, style="arc",
+        )
+        if self.progress > 0:
+            self.create_arc(
+                x1, y1, x2, y2, start=90, extent=-360 * (self.progress / 100),
+                outline=THEME.accent_primary, width=self.thickness, style="arc",
+            )
+        self.create_text(
+            self.ring_size // 2, self.ring_size // 2, text=f"{int(self.progress)}%",
+            fill=THEME.text_primary, font=(THEME.font_family, 14, "bold"),
+        )
+
+
+class LegacyModernButton(ModernButton):
+    """ModernButton that rebuilds its polygon and label on every redraw."""
+
+    def redraw(self) -> None:
+        """Redraw the button from scratch."""
+        self.delete("all")
+        self._drawn_state = None
+        self._create_items()
+        super().redraw()
+
+
+def measure(root: tk.Tk, updates: int, step: Callable[[int], None]) -> float:
+    """Run ``step`` for every update, letting Tk render, and return updates/s."""
+    start = time.perf_counter()
+    for i in range(updates):
+        step(i)
+        root.update_idletasks()
+    return updates / (time.perf_counter() - start)
+
+
+def report(name: str, legacy: float, current: float) -> None:
+    """Print one before/after comparison line."""
+    print(f"{name:32} {legacy:>10,.0f}/s -> {current:>10,.0f}/s ({current / legacy:.1f}x)")
+
+
+def main() -> None:
+    """Run the widget benchmarks and print updates per second."""
+    parser = argparse.ArgumentParser(description="Benchmark widget rendering.")
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    updates = args.updates
+
+    root = tk.Tk()
+    frame = tk.Frame(root)
+    frame.pack()
+
+    legacy_ring = LegacyProgressRing(frame)
+    ring = ProgressRing(frame)
+    report(
+        "progress ring, per-char updates",
+        measure(root, updates, lambda i: legacy_ring.set_progress(i * 100 / updates)),
+        measure(root, updates, lambda i: ring.set_progress(i * 100 / updates)),
+    )
+
+    legacy_button = LegacyModernButton(frame, "Legacy")
+    button = ModernButton(frame, "Current")
+    report(
+        "button enable toggles",
+        measure(root, updates, lambda i: legacy_button.set_enabled(i % 2 == 0)),
+        measure(root, updates, lambda i: button.set_enabled(i % 2 == 0)),
+    )
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
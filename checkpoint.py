@@ -0,0 +1,264 @@
+"""
+Phantom Keys - Checkpoints
+
+Periodically records how far a typing session got, so that a session cut
+short by Stop or a crash can be resumed where it left off.
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from engine import KeyAction, KeystrokePlan, PlanSettings, TypingEngine, text_digest
+
+
+CHECKPOINT_VERSION = 1
+
+# Pause after erasing a typo left over from the interrupted session.
+CORRECTION_DELAY = 0.1
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """Everything needed to continue typing a text from an offset."""
+
+    text_hash: str
+    total_chars: int
+    offset: int
+    settings: PlanSettings
+    random_state: Optional[Any] = None
+    typo_pending: bool = False
+    saved_at: float = 0.0
+
+    @classmethod
+    def begin(
+        cls, text: str, settings: PlanSettings, random_state: Optional[Any] = None
+    ) -> Checkpoint:
+        """Checkpoint for a session that types ``text`` from the start."""
+        return cls(text_digest(text).hex(), len(text), 0, settings, random_state)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the checkpoint to JSON-compatible data."""
+        return {
+            "version": CHECKPOINT_VERSION,
+            "text_hash": self.text_hash,
+            "total_chars": self.total_chars,
+            "offset": self.offset,
+            "settings": self.settings._asdict(),
+            "random_state": self.random_state,
+            "typo_pending": self.typo_pending,
+            "saved_at": self.saved_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Checkpoint:
+        """Rebuild a checkpoint from ``to_dict`` output."""
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {data.get('version')}")
+        state = data.get("random_state")
+        if state is not None:
+            version, internal, gauss_next = state
+            state = (version, tuple(internal), gauss_next)
+        return cls(
+            text_hash=data["text_hash"],
+            total_chars=data["total_chars"],
+            offset=data["offset"],
+            settings=PlanSettings(**data["settings"]),
+            random_state=state,
+            typo_pending=data.get("typo_pending", False),
+            saved_at=data.get("saved_at", 0.0),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the checkpoint atomically, so a crash never leaves half a file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(self.to_dict(), handle)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> Checkpoint:
+        """Read a checkpoint file, raising ValueError if it is unusable."""
+        with open(path, encoding="utf-8") as handle:
+            try:
+                data = json.load(handle)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path} is not a valid checkpoint: {error}") from None
+        try:
+            return cls.from_dict(data)
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"{path} is not a valid checkpoint: {error}") from None
+
+    def matches(self, text: str) -> bool:
+        """Whether the checkpoint was taken while typing this text."""
+        return text_digest(text).hex() == self.text_hash and len(text) == self.total_chars
+
+    @property
+    def percent(self) -> float:
+        """How much of the text had been typed."""
+        return self.offset / max(self.total_chars, 1) * 100
+
+
+def resume_plan(engine: TypingEngine, checkpoint: Checkpoint, text: str) -> KeystrokePlan:
+    """
+    Rebuild the plan of a checkpointed session and return its remaining part.
+
+    The plan is generated again with the saved settings, and with the saved
+    global random state for unseeded plans, so the rest of the session has
+    the timing it would have had. If a typo was left on screen, the rest
+    starts by erasing it. Raises ValueError if the text changed.
+    """
+    if not checkpoint.matches(text):
+        raise ValueError("The text has changed since the checkpoint was taken")
+    if checkpoint.settings.seed is None and checkpoint.random_state is not None:
+        random.setstate(checkpoint.random_state)
+    plan = engine.build_plan(text, *checkpoint.settings)
+    rest = plan.slice_offsets(checkpoint.offset)
+    if not checkpoint.typo_pending:
+        return rest
+    if len(rest) and rest[0].action == KeyAction.TYPO:
+        return rest[1:]
+    # The plan was not rebuilt exactly as typed, so erase the typo explicitly.
+    backspace = (checkpoint.offset, KeyAction.BACKSPACE, "backspace", 0.0)
+    events = (
+        (offset, action, key, at + CORRECTION_DELAY)
+        for offset, action, key, at in rest.iter_events()
+    )
+    return KeystrokePlan.from_events(itertools.chain((backspace,), events), rest.total_chars)
+
+
+class CheckpointWriter:
+    """
+    Saves a session's progress from a background thread.
+
+    The typing thread never touches the file: it only refreshes
+    ``TypingEngine.resume_point`` every ``PHASE_PUBLISH_INTERVAL`` seconds, and
+    this writer saves it every ``interval`` seconds when it has moved. At
+    most ``interval`` plus the publish interval of typing is lost in a
+    crash, and each write is one small JSON file. ``stats`` reports how
+    many writes the current session made and how long they took.
+    """
+
+    def __init__(self, engine: TypingEngine, path: str, interval: float = 2.0) -> None:
+        """Prepare a writer for ``engine`` that saves to ``path``."""
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self._template: Optional[Checkpoint] = None
+        self._start_offset = 0
+        self._written = (-1, False)
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, checkpoint: Checkpoint) -> None:
+        """Begin checkpointing a session that starts where ``checkpoint`` is."""
+        self._template = checkpoint
+        self._start_offset = checkpoint.offset
+        self._written = (-1, False)
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self._done.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Save progress every ``interval`` seconds until the session ends."""
+        while not self._done.wait(self.interval):
+            self._write()
+
+    def _write(self) -> None:
+        """Save the current position if it moved since the last write."""
+        if self._template is None:
+            return
+        offset, typo_pending = self.engine.resume_point
+        if offset < self._start_offset:
+            offset, typo_pending = self._start_offset, self._template.typo_pending
+        if (offset, typo_pending) == self._written:
+            return
+        started = time.perf_counter()
+        checkpoint = Checkpoint(
+            self._template.text_hash,
+            self._template.total_chars,
+            offset,
+            self._template.settings,
+            self._template.random_state,
+            typo_pending,
+            time.time(),
+        )
+        try:
+            checkpoint.save(self.path)
+        except OSError:
+            return
+        elapsed = time.perf_counter() - started
+        self._written = (offset, typo_pending)
+        self.writes += 1
+        self.write_seconds += elapsed
+        self.max_write_seconds = max(self.max_write_seconds, elapsed)
+
+    def finish(self, completed: bool) -> None:
+        """
+        Stop the writer once the session is over.
+
+        A completed session removes its checkpoint; an interrupted one
+        saves its final position so it can be resumed.
+        """
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if completed:
+            discard_checkpoint(self.path)
+        else:
+            self._write()
+        self._template = None
+
+    def stats(self) -> dict[str, float]:
+        """Number of checkpoint writes this session and their cost in milliseconds."""
+        return {
+            "writes": self.writes,
+            "mean_write_ms": self.write_seconds / max(self.writes, 1) * 1000,
+            "max_write_ms": self.max_write_seconds * 1000,
+        }
+
+
+def format_checkpoint_stats(stats: dict[str, float]) -> str:
+    """Describe the checkpoint writes of a session in one line."""
+    if not stats["writes"]:
+        return "no checkpoints written"
+    return (
+        f"{stats['writes']:.0f} checkpoints written, {stats['mean_write_ms']:.2f} ms "
+        f"on average, {stats['max_write_ms']:.2f} ms at most"
+    )
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """Return the checkpoint saved at ``path``, or None if there is none."""
+    try:
+        return Checkpoint.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def discard_checkpoint(path: str) -> None:
+    """Delete a checkpoint file if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
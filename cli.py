@@ -0,0 +1,445 @@
+"""
+Phantom Keys - Command Line Interface
+
+Types a text file (or stdin) without the GUI. tkinter is never imported,
+and the output backend is only imported once typing is about to start.
+
+Usage: python cli.py FILE [options]    (use "-" to read from stdin)
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import time
+
+_LAUNCHED = time.perf_counter()
+
+import argparse
+import contextlib
+import functools
+import importlib.util
+import random
+import signal
+import sys
+from typing import TYPE_CHECKING, Any, BinaryIO, Optional
+
+from backends import BACKENDS, CharRoute, OutputBackend, create_backend
+from engine import (
+    MAX_SEED,
+    DryRunReport,
+    PlanSettings,
+    TypingEngine,
+    format_duration,
+    format_phases,
+    unix_newlines,
+)
+
+if TYPE_CHECKING:
+    from update import UpdateReport
+
+
+def positive_int(value: str) -> int:
+    """Parse a whole number of at least 1 for argparse."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def percentage(value: str) -> float:
+    """Parse a percentage from 0 to 100 for argparse."""
+    number = float(value)
+    if not 0 <= number <= 100:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 100, got {value}")
+    return number
+
+
+def plan_seed(value: str) -> int:
+    """Parse a seed NumPy accepts and a plan file can store, for argparse."""
+    number = int(value)
+    if not 0 <= number <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"must be between 0 and {MAX_SEED}, got {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser; defaults match the GUI sliders."""
+    parser = argparse.ArgumentParser(
+        prog="phantom-keys",
+        description="Type a text file with human-like timing.",
+    )
+    parser.add_argument("file", help='text file to type, or "-" for stdin')
+    parser.add_argument("--wpm", type=positive_int, default=55, help="typing speed (default: 55)")
+    parser.add_argument(
+        "--typo-rate", type=percentage, default=3, help="typo rate in percent (default: 3)"
+    )
+    parser.add_argument(
+        "--variability",
+        type=percentage,
+        default=35,
+        help="timing variability in percent (default: 35)",
+    )
+    parser.add_argument(
+        "--start-delay",
+        type=float,
+        default=5,
+        help="seconds to wait before typing (default: 5)",
+    )
+    parser.add_argument(
+        "--no-burst",
+        dest="burst",
+        action="store_false",
+        help="disable occasional speed bursts",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="pyautogui",
+        help="keystroke output backend (default: pyautogui)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="simulate the session and print a projection instead of typing",
+    )
+    parser.add_argument(
+        "--seed",
+        type=plan_seed,
+        help="make the timing and typos reproducible (requires NumPy)",
+    )
+    parser.add_argument(
+        "--save-plan",
+        metavar="FILE",
+        help="save the generated keystroke plan to FILE before typing",
+    )
+    parser.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="replay a saved plan with its saved settings; the text must match",
+    )
+    parser.add_argument(
+        "--plan-cache",
+        metavar="DIR",
+        help="with --seed, reuse the plans saved in DIR and save new ones there",
+    )
+    parser.add_argument(
+        "--update-from",
+        metavar="OLD_FILE",
+        help="OLD_FILE is already typed: only type the changes that turn it into FILE",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="save progress to FILE so an interrupted session can be resumed",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="how often to save progress (default: 2)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="with --checkpoint, continue from the saved progress",
+    )
+    parser.add_argument(
+        "--keep-cr",
+        action="store_true",
+        help="type carriage returns as they are instead of reading CRLF/CR as newlines",
+    )
+    parser.add_argument("--display", help="X display for the xtest backend, e.g. :99")
+    parser.add_argument("--record-file", help="JSON lines output for the recording backend")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write a per-keystroke timing trace (.csv, otherwise JSON lines)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="save a cProfile capture of the typing session in pstats format",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="with --profile, also save a tracemalloc snapshot to FILE.tracemalloc",
+    )
+    return parser
+
+
+def open_backend(args: argparse.Namespace) -> OutputBackend:
+    """Create (and thereby import) the requested output backend."""
+    if args.backend == "xtest":
+        return create_backend("xtest", display=args.display)
+    if args.backend == "recording":
+        return create_backend("recording", path=args.record_file)
+    return create_backend(args.backend)
+
+
+def report(message: str) -> None:
+    """Print a status line to stderr so stdout stays clean."""
+    print(message, file=sys.stderr, flush=True)
+
+
+def print_dry_run(report: DryRunReport) -> None:
+    """Print a dry run projection and its timeline."""
+    print(f"Projected duration: {format_duration(report.duration)}")
+    print(f"Keystrokes: {report.keystrokes}")
+    print(f"Characters: {report.chars_typed}, words: {report.words}, typos: {report.typos}")
+    print()
+    print(f"{'elapsed':>12} {'progress':>9} {'chars':>9} {'pace':>9}")
+    for point in report.timeline:
+        print(
+            f"{format_duration(point.elapsed):>12} {point.percent:>8.0f}% "
+            f"{point.chars_typed:>9} {point.wpm:>5.0f} WPM"
+        )
+
+
+def print_update_report(update: UpdateReport) -> None:
+    """Print what an incremental update types, next to typing from scratch."""
+    print(
+        f"Update: {update.edits} changes, {update.deleted} chars deleted, "
+        f"{update.inserted} chars typed, {update.navigation} cursor keys"
+    )
+    print(
+        f"{update.keystrokes} keystrokes in {format_duration(update.duration)}, "
+        f"against {update.full_keystrokes} in {format_duration(update.full_duration)} "
+        f"to retype everything ({update.keystroke_saving:.0f}x fewer keystrokes, "
+        f"{update.time_saving:.0f}x faster)"
+    )
+
+
+def print_trace_summary(summary: dict[str, Any]) -> None:
+    """Print trace percentiles and the pace over time to stderr."""
+    report(f"Trace: {summary['events']} events ({summary['dropped']} dropped)")
+    for name in ("lateness", "call", "overshoot"):
+        report(
+            f"  {name:>9}: p50 {summary[f'{name}_p50_ms']:.2f} ms, "
+            f"p95 {summary[f'{name}_p95_ms']:.2f} ms, "
+            f"p99 {summary[f'{name}_p99_ms']:.2f} ms, "
+            f"max {summary[f'{name}_max_ms']:.2f} ms"
+        )
+    for elapsed, wpm in summary["wpm_over_time"]:
+        report(f"  {format_duration(elapsed):>9}: {wpm:.0f} WPM")
+
+
+def read_text(path: str, normalize_newlines: bool = True) -> str:
+    """Read a whole text file, or stdin for "-", keeping its whitespace exactly."""
+    if path == "-":
+        text = sys.stdin.buffer.read().decode("utf-8", errors="replace")
+    else:
+        with open(path, encoding="utf-8", newline="") as handle:
+            text = handle.read()
+    return unix_newlines(text) if normalize_newlines else text
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run a headless typing session and return the exit code."""
+    args = build_parser().parse_args(argv)
+    settings = PlanSettings(
+        args.wpm, args.typo_rate / 100, args.variability / 100, args.burst, args.seed
+    )
+    normalize = not args.keep_cr
+    if args.seed is not None and importlib.util.find_spec("numpy") is None:
+        report("--seed needs NumPy, install it with: pip install numpy")
+        return 2
+
+    if args.dry_run and args.update_from:
+        from update import build_update_plan
+
+        old_text = read_text(args.update_from, normalize)
+        _, update = build_update_plan(
+            TypingEngine(), old_text, read_text(args.file, normalize), *settings[:4]
+        )
+        print_update_report(update)
+        return 0
+
+    if args.dry_run:
+        text = read_text(args.file, normalize)
+        start = time.perf_counter()
+        projection = TypingEngine().dry_run(text, *settings[:4], seed=settings.seed)
+        print_dry_run(projection)
+        report_time = (time.perf_counter() - start) * 1000
+        print(f"\nSimulated in {report_time:.0f} ms", file=sys.stderr)
+        return 0
+
+    if args.resume and not args.checkpoint:
+        report("--resume needs --checkpoint FILE")
+        return 2
+    if args.plan_cache and args.seed is None:
+        report("--plan-cache needs --seed, unseeded plans are never reused")
+        return 2
+
+    engine = TypingEngine()
+    if args.plan_cache:
+        from plancache import PlanCache
+
+        try:
+            engine.plan_cache = PlanCache(spill_dir=args.plan_cache)
+        except OSError as error:
+            report(f"Cannot use plan cache: {error}")
+            return 1
+    stream: Optional[BinaryIO] = None
+    plan_file = None
+    checkpoints = None
+    if args.plan:
+        from planfile import load_plan
+
+        text = read_text(args.file, normalize)
+        try:
+            plan_file = load_plan(args.plan, text)
+        except (OSError, ValueError) as error:
+            report(f"Cannot replay plan: {error}")
+            return 1
+        saved = plan_file.settings
+        report(
+            f"Replaying {args.plan}: {saved.wpm} WPM, {saved.typo_rate:.0%} typos, "
+            f"{saved.variability:.0%} variability, burst {'on' if saved.burst_mode else 'off'}"
+        )
+        play = functools.partial(engine.play_plan, plan_file.plan)
+    elif args.save_plan:
+        from planfile import save_plan
+
+        text = read_text(args.file, normalize)
+        plan = engine.build_plan(text, *settings)
+        save_plan(args.save_plan, plan, text, settings)
+        report(f"Saved plan to {args.save_plan}")
+        play = functools.partial(engine.play_plan, plan)
+    elif args.update_from:
+        from update import build_update_plan
+
+        old_text = read_text(args.update_from, normalize)
+        plan, update = build_update_plan(
+            engine, old_text, read_text(args.file, normalize), *settings[:4]
+        )
+        print_update_report(update)
+        play = functools.partial(engine.play_plan, plan)
+    elif args.checkpoint:
+        from checkpoint import (
+            Checkpoint,
+            CheckpointWriter,
+            format_checkpoint_stats,
+            load_checkpoint,
+            resume_plan,
+        )
+
+        text = read_text(args.file, normalize)
+        try:
+            checkpoint = load_checkpoint(args.checkpoint) if args.resume else None
+            if checkpoint is not None:
+                plan = resume_plan(engine, checkpoint, text)
+        except (OSError, ValueError) as error:
+            report(f"Cannot resume: {error}")
+            return 1
+        if checkpoint is not None:
+            report(f"Resuming from {checkpoint.percent:.0f}% with the saved settings")
+        else:
+            if args.resume:
+                report(f"No checkpoint at {args.checkpoint}, starting from the beginning")
+            checkpoint = Checkpoint.begin(text, settings, random.getstate())
+            plan = engine.build_plan(text, *settings)
+        checkpoints = CheckpointWriter(engine, args.checkpoint, args.checkpoint_interval)
+        play = functools.partial(engine.play_plan, plan)
+    elif args.seed is not None:
+        # Seeded plans are built from the whole text, as on every other path,
+        # so a seed gives the same timing whether or not the plan is cached.
+        plan = engine.build_plan(read_text(args.file, normalize), *settings)
+        play = functools.partial(engine.play_plan, plan)
+    else:
+        stream = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        play = functools.partial(
+            engine.type_stream,
+            stream,
+            *settings[:4],
+            seed=settings.seed,
+            normalize_newlines=normalize,
+        )
+
+    if engine.plan_cache is not None:
+        engine.plan_cache.save()
+
+    backend: Optional[OutputBackend] = None
+    typing = completed = False
+    interrupt_handler = signal.getsignal(signal.SIGINT)
+    # Until typing starts, Ctrl+C raises KeyboardInterrupt; either way the
+    # backend and the input are closed below.
+    try:
+        backend = open_backend(args)
+        engine.backend = backend
+        engine.status_callback = report
+        if args.trace:
+            from tracing import KeystrokeTrace
+
+            engine.trace = KeystrokeTrace()
+        engine.calibrate()
+        startup_ms = (time.perf_counter() - _LAUNCHED) * 1000
+        report(f"Startup took {startup_ms:.0f} ms ({backend.name} backend)")
+
+        if args.start_delay > 0:
+            report(f"Starting in {args.start_delay:g}s, switch to the target window...")
+            time.sleep(args.start_delay)
+
+        if args.profile:
+            from profiling import capture_profile
+
+            session = capture_profile(args.profile, args.profile_memory)
+        else:
+            session = contextlib.nullcontext()
+
+        if checkpoints is not None:
+            checkpoints.start(checkpoint)
+        # Ctrl+C stops between keystrokes, so the saved progress is exact.
+        signal.signal(signal.SIGINT, lambda *_: engine.stop())
+        typing = True
+        with session:
+            play()
+        completed = not engine.stopped
+    except KeyboardInterrupt:
+        engine.stop()
+        report("Typing stopped" if typing else "Cancelled before typing started")
+        return 130
+    finally:
+        signal.signal(signal.SIGINT, interrupt_handler)
+        if stream is not None:
+            stream.close()
+        if backend is not None:
+            backend.close()
+        if plan_file is not None:
+            plan_file.close()
+        if checkpoints is not None and typing:
+            checkpoints.finish(completed)
+            report(f"Checkpoints: {format_checkpoint_stats(checkpoints.stats())}")
+            if not completed:
+                report(f"Progress saved to {args.checkpoint}, continue with --resume")
+        if engine.trace is not None and typing:
+            engine.trace.export(args.trace)
+            print_trace_summary(engine.trace.summary())
+        if engine.plan_cache is not None:
+            from plancache import format_plan_cache_stats
+
+            report(f"Plan cache: {format_plan_cache_stats(engine.plan_cache.stats())}")
+    if engine.stopped:
+        return 130
+
+    stats = engine.stats
+    timing = engine.timing
+    report(
+        f"Typed {stats['chars_typed']} chars, {stats['words_completed']} words, "
+        f"{stats['typos_made']} typos made in {timing['elapsed_s']:.1f}s "
+        f"({timing['effective_wpm']:.0f} WPM, drift {timing['drift_ms']:.1f} ms)"
+    )
+    routes = engine.routes
+    if any(count for route, count in routes.items() if route != CharRoute.KEY):
+        report(
+            "Characters: " + ", ".join(f"{count} {route}" for route, count in routes.items())
+        )
+    report(f"Time: {format_phases(engine.phases)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1684 @@
+"""
+Phantom Keys - Typing Engine
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import codecs
+import contextlib
+import hashlib
+import io
+import os
+import random
+import re
+import stat
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+    overload,
+)
+
+from backends import (
+    Calibration,
+    CharRoute,
+    OutputBackend,
+    PyAutoGUIBackend,
+    calibrate_output,
+)
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from plancache import PlanCache
+    from tracing import KeystrokeTrace
+    from update import UpdateReport
+
+
+# Typing Engine
+
+
+class KeyAction:
+    """Kinds of keystroke events that make up a typing plan."""
+
+    CHAR = 0
+    TYPO = 1
+    BACKSPACE = 2
+    SPACE = 3
+    ENTER = 4
+    # Editing an already typed text (see update.py).
+    DELETE = 5
+    LEFT = 6
+    RIGHT = 7
+    DOC_START = 8
+    DOC_END = 9
+    PARAGRAPH_UP = 10
+    PARAGRAPH_DOWN = 11
+    WORD_LEFT = 12
+
+
+class SeedDraw:
+    """
+    Column of each per-character random draw in a seeded plan.
+
+    Seeded plans draw exactly ``COUNT`` uniform numbers for every source
+    character, used or not, so the scalar and the vectorised planner read
+    the same numbers from the generator. Newlines use the ``ENTER`` column.
+    """
+
+    TYPO = 0
+    ENTER = 0
+    TYPO_CHAR = 1
+    TYPO_HOLD = 2
+    BACKSPACE = 3
+    JITTER = 4
+    THINK = 5
+    THINK_LENGTH = 6
+    BURST = 7
+    SPACE = 8
+    COUNT = 9
+
+    # Characters whose draws are generated together; bounds temporary memory.
+    BLOCK_SIZE = 1 << 16
+
+
+class KeyEvent(NamedTuple):
+    """A single scheduled keystroke, timed in seconds from the plan start."""
+
+    offset: int
+    action: int
+    key: str
+    time: float
+
+
+# Plan columns are arrays, or memoryviews of a mapped plan file.
+PlanColumn = Union[array, memoryview]
+
+
+class PlanSettings(NamedTuple):
+    """Settings a keystroke plan was generated with."""
+
+    wpm: int
+    typo_rate: float
+    variability: float
+    burst_mode: bool
+    seed: Optional[int] = None
+
+
+# Seeds go to NumPy, which needs them non-negative, and into plan files as
+# signed 64-bit integers.
+MAX_SEED = 2**63 - 1
+
+
+class KeystrokePlan:
+    """
+    Immutable, precompiled sequence of keystroke events for a text.
+
+    Events are stored column-wise in typed arrays: scheduled time (float64),
+    key code (uint32), action (uint8) and source text offset (uint32), which
+    is 17 bytes per keystroke. A tuple of ``KeyEvent`` objects needs well
+    over 100. Slicing by text offset returns a view that shares the columns,
+    so playback can start mid-document without copying the plan.
+    """
+
+    __slots__ = ("times", "keys", "actions", "offsets", "total_chars", "_start", "_stop")
+
+    # Key codes stored for named-key actions, and the key each one presses.
+    # From DOC_START on, actions are jumps the backend makes with its own
+    # platform's shortcut for the key (see OutputBackend.navigate).
+    PRESS_CODES = {
+        KeyAction.BACKSPACE: 0x08,
+        KeyAction.SPACE: 0x20,
+        KeyAction.ENTER: 0x0A,
+        KeyAction.DELETE: 0x7F,
+        KeyAction.LEFT: 0x25,
+        KeyAction.RIGHT: 0x27,
+        KeyAction.DOC_START: 0x24,
+        KeyAction.DOC_END: 0x23,
+        KeyAction.PARAGRAPH_UP: 0x26,
+        KeyAction.PARAGRAPH_DOWN: 0x28,
+        KeyAction.WORD_LEFT: 0x25,
+    }
+    PRESS_KEYS = {
+        KeyAction.BACKSPACE: "backspace",
+        KeyAction.SPACE: "space",
+        KeyAction.ENTER: "enter",
+        KeyAction.DELETE: "delete",
+        KeyAction.LEFT: "left",
+        KeyAction.RIGHT: "right",
+        KeyAction.DOC_START: "home",
+        KeyAction.DOC_END: "end",
+        KeyAction.PARAGRAPH_UP: "up",
+        KeyAction.PARAGRAPH_DOWN: "down",
+        KeyAction.WORD_LEFT: "left",
+    }
+
+    def __init__(
+        self,
+        times: PlanColumn,
+        keys: PlanColumn,
+        actions: PlanColumn,
+        offsets: PlanColumn,
+        total_chars: int,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> None:
+        """Wrap plan columns, optionally viewing only events ``start:stop``."""
+        self.times = times
+        self.keys = keys
+        self.actions = actions
+        self.offsets = offsets
+        self.total_chars = total_chars
+        self._start = start
+        self._stop = len(times) if stop is None else stop
+
+    @classmethod
+    def from_events(
+        cls, events: Iterable[tuple[int, int, str, float]], total_chars: int
+    ) -> KeystrokePlan:
+        """Pack (offset, action, key, time) events into plan columns."""
+        times = array("d")
+        keys = array("I")
+        actions = array("B")
+        offsets = array("I")
+        add_time = times.append
+        add_key = keys.append
+        add_action = actions.append
+        add_offset = offsets.append
+        press_codes = cls.PRESS_CODES
+        for offset, action, key, at in events:
+            add_offset(offset)
+            add_action(action)
+            add_key(ord(key) if action <= KeyAction.TYPO else press_codes[action])
+            add_time(at)
+        return cls(times, keys, actions, offsets, total_chars)
+
+    def __len__(self) -> int:
+        """Number of keystrokes in the plan."""
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> KeyEvent: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> KeystrokePlan: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[KeyEvent, KeystrokePlan]:
+        """Return one event timed from the start of this view, or a view of a range."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("plan slices cannot have a step")
+            return KeystrokePlan(
+                self.times,
+                self.keys,
+                self.actions,
+                self.offsets,
+                self.total_chars,
+                self._start + start,
+                self._start + max(stop, start),
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("plan index out of range")
+        position = self._start + index
+        action = self.actions[position]
+        code = self.keys[position]
+        key = chr(code) if action <= KeyAction.TYPO else self.PRESS_KEYS[action]
+        return KeyEvent(
+            self.offsets[position], action, key, self.times[position] - self._base()
+        )
+
+    def __iter__(self) -> Iterator[KeyEvent]:
+        """Yield the events as ``KeyEvent`` tuples."""
+        return map(KeyEvent._make, self.iter_events())
+
+    def __eq__(self, other: object) -> bool:
+        """Plans are equal when their viewed events and text length match."""
+        if not isinstance(other, KeystrokePlan):
+            return NotImplemented
+        return (
+            self.total_chars == other.total_chars
+            and len(self) == len(other)
+            and all(a == b for a, b in zip(self.iter_events(), other.iter_events()))
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def _base(self) -> float:
+        """Scheduled time of the first event in this view."""
+        return self.times[self._start] if self._start and len(self) else 0.0
+
+    def _column(self, column: PlanColumn) -> memoryview:
+        """A zero-copy view of one column restricted to this plan's events."""
+        return memoryview(column)[self._start : self._stop]
+
+    def columns(self) -> tuple[PlanColumn, PlanColumn, PlanColumn, PlanColumn]:
+        """Return this view's times, keys, actions and offsets, times starting at zero."""
+        times: PlanColumn = self._column(self.times)
+        base = self._base()
+        if base:
+            times = array("d", [value - base for value in times])
+        return (
+            times,
+            self._column(self.keys),
+            self._column(self.actions),
+            self._column(self.offsets),
+        )
+
+    def iter_events(self) -> Iterator[tuple[int, int, str, float]]:
+        """Yield plain (offset, action, key, time) tuples for playback."""
+        base = self._base()
+        press_keys = self.PRESS_KEYS
+        typo = KeyAction.TYPO
+        for offset, action, code, at in zip(
+            self._column(self.offsets),
+            self._column(self.actions),
+            self._column(self.keys),
+            self._column(self.times),
+        ):
+            yield offset, action, chr(code) if action <= typo else press_keys[action], at - base
+
+    def slice_offsets(self, start: int, stop: Optional[int] = None) -> KeystrokePlan:
+        """
+        View the events that type text offsets ``start`` up to ``stop``.
+
+        Times in the view are measured from its first event, while offsets
+        keep pointing into the full text, so progress stays correct.
+        """
+        first = bisect_left(self.offsets, start, self._start, self._stop)
+        last = self._stop if stop is None else bisect_left(self.offsets, stop, first, self._stop)
+        return KeystrokePlan(
+            self.times, self.keys, self.actions, self.offsets, self.total_chars, first, last
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the events in this view."""
+        return len(self) * sum(
+            column.itemsize for column in (self.times, self.keys, self.actions, self.offsets)
+        )
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first keystroke to the last one."""
+        return self.times[self._stop - 1] - self._base() if len(self) else 0.0
+
+    @property
+    def typo_count(self) -> int:
+        """Number of typos that will be made and corrected."""
+        return self._column(self.actions).tolist().count(KeyAction.TYPO)
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as hours, minutes and seconds."""
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {secs:02d}s"
+    return f"{minutes}m {secs:02d}s"
+
+
+def text_digest(text: str) -> bytes:
+    """SHA-256 of a text, used to check that a saved plan belongs to it."""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+
+
+def format_phases(phases: dict[str, float]) -> str:
+    """Format a phase breakdown as the share of wall time spent in each phase."""
+    wall = phases.get("wall_s", 0.0)
+    if wall <= 0:
+        return "No timing yet"
+    parts = [
+        f"{name} {phases[f'{name}_s'] / wall:.1%}"
+        for name in ("sleep", "backend", "callbacks", "planning", "paused", "other")
+    ]
+    return ", ".join(parts)
+
+
+class TimelinePoint(NamedTuple):
+    """Simulated session state at one point of a dry run."""
+
+    elapsed: float
+    percent: float
+    chars_typed: int
+    wpm: float
+
+
+@dataclass(frozen=True)
+class DryRunReport:
+    """Projected outcome of typing a text, simulated on a virtual clock."""
+
+    duration: float
+    keystrokes: int
+    chars_typed: int
+    typos: int
+    words: int
+    timeline: tuple[TimelinePoint, ...]
+
+
+class TokenKind:
+    """Kinds of runs ``iter_tokens`` splits text into; each is a pattern group."""
+
+    WORD = 1
+    BLANK = 2
+    NEWLINE = 3
+
+
+# A run of non-whitespace, a run of whitespace other than newlines, or one
+# newline. Every character of a text falls in exactly one match.
+TOKEN_PATTERN = re.compile(r"(\S+)|([^\S\n]+)|(\n)")
+
+
+def iter_tokens(
+    chunks: Iterable[str], start: int = 0
+) -> Iterator[tuple[int, int, str]]:
+    """
+    Split text into words, blank runs and newlines in a single pass.
+
+    Yields ``(offset, kind, token)`` with the offset of the token's first
+    character in the whole text, which begins at ``start``. Nothing is
+    skipped or merged: indentation, tabs and repeated spaces come out
+    exactly as they are. A word or blank run that straddles two chunks
+    comes out as two tokens.
+    """
+    finditer = TOKEN_PATTERN.finditer
+    offset = start
+    for chunk in chunks:
+        for match in finditer(chunk):
+            yield (offset + match.start(), match.lastindex, match.group())
+        offset += len(chunk)
+
+
+def unix_newlines(text: str) -> str:
+    """Turn Windows (CRLF) and old Mac (CR) line endings into newlines."""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class TextSource:
+    """
+    Text to type, read incrementally in chunks.
+
+    Strings are handed over as one chunk. Binary streams are decoded chunk
+    by chunk, so a large file or stdin starts typing after its first chunk
+    is read. Progress is measured in the source's own units (bytes for
+    binary streams, characters otherwise) against ``total_size`` when known.
+    With ``normalize_newlines``, CRLF and CR line endings are read as
+    newlines, even when a CRLF pair is split between two chunks.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        stream: Union[str, IO[str], IO[bytes]],
+        total_size: Optional[int] = None,
+        encoding: str = "utf-8",
+        normalize_newlines: bool = False,
+    ) -> None:
+        """Wrap a string or a text/binary file object."""
+        if normalize_newlines and isinstance(stream, str):
+            stream = unix_newlines(stream)
+        self._stream = stream
+        self.encoding = encoding
+        self.normalize_newlines = normalize_newlines
+        if total_size is None:
+            total_size = len(stream) if isinstance(stream, str) else self._stream_size(stream)
+        self.total_size = total_size
+        self.consumed = 0
+        self._boundaries: deque[tuple[int, int]] = deque()
+        self._previous: tuple[int, int] = (0, 0)
+
+    @staticmethod
+    def _stream_size(stream: IO[Any]) -> Optional[int]:
+        """Return the size of a binary regular file, if it can be determined."""
+        if isinstance(stream, io.TextIOBase):
+            return None
+        try:
+            info = os.fstat(stream.fileno())
+        except (AttributeError, OSError, ValueError):
+            return None
+        return info.st_size if stat.S_ISREG(info.st_mode) else None
+
+    def chunks(self) -> Iterator[str]:
+        """Yield decoded text chunks, recording how much input each consumed."""
+        if isinstance(self._stream, str):
+            self.consumed = len(self._stream)
+            self._boundaries.append((len(self._stream), self.consumed))
+            yield self._stream
+            return
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        chars = 0
+        carry = ""
+        while True:
+            raw = self._stream.read(self.CHUNK_SIZE)
+            if isinstance(raw, bytes):
+                text = decoder.decode(raw, final=not raw)
+            else:
+                text = raw
+            self.consumed += len(raw)
+            if self.normalize_newlines:
+                # Hold back a trailing CR until we know whether an LF follows.
+                text = carry + text
+                carry = "\r" if raw and text.endswith("\r") else ""
+                text = unix_newlines(text[: len(text) - len(carry)])
+            if text:
+                chars += len(text)
+                self._boundaries.append((chars, self.consumed))
+                yield text
+            if not raw:
+                return
+
+    def fraction(self, offset: int) -> float:
+        """Fraction of the input consumed once the character at ``offset`` is typed."""
+        boundaries = self._boundaries
+        while len(boundaries) > 1 and offset >= boundaries[0][0]:
+            self._previous = boundaries.popleft()
+        if not boundaries or not self.total_size:
+            return 0.0
+
+        char_start, unit_start = self._previous
+        char_end, unit_end = boundaries[0]
+        span = char_end - char_start
+        consumed = unit_end
+        if span > 0 and offset + 1 < char_end:
+            consumed = unit_start + (unit_end - unit_start) * (offset + 1 - char_start) / span
+        return min(consumed / self.total_size, 1.0)
+
+
+class Clock:
+    """
+    Real time source used by the scheduler.
+
+    ``sleep_until`` coarse-sleeps until ``spin_window`` seconds before the
+    deadline and then spins on ``time.perf_counter()``. A larger spin window
+    buys precision with CPU time; zero disables spinning entirely.
+    """
+
+    def now(self) -> float:
+        """Return the current time in seconds."""
+        return time.perf_counter()
+
+    def sleep_until(
+        self,
+        deadline: float,
+        spin_window: float,
+        interrupt: Optional[threading.Event] = None,
+    ) -> Optional[float]:
+        """
+        Block until ``deadline`` and return the time of waking.
+
+        If ``interrupt`` is set before the deadline the wait ends early and
+        ``None`` is returned.
+        """
+        remaining = deadline - time.perf_counter()
+
+        if remaining > spin_window:
+            if interrupt is None:
+                time.sleep(remaining - spin_window)
+            elif interrupt.wait(remaining - spin_window):
+                return None
+
+        now = time.perf_counter()
+        while now < deadline:
+            if interrupt is not None and interrupt.is_set():
+                return None
+            time.sleep(0)
+            now = time.perf_counter()
+        return now
+
+    async def sleep_until_async(
+        self,
+        deadline: float,
+        interrupt: Optional[threading.Event] = None,
+        poll_interval: float = 0.05,
+    ) -> Optional[float]:
+        """
+        Await ``deadline`` on the running event loop and return the time of waking.
+
+        Nothing spins, so other tasks keep running and the deadline is met
+        to within the loop's timer resolution. ``interrupt`` is checked at
+        least every ``poll_interval`` seconds; once it is set the wait ends
+        early and ``None`` is returned.
+        """
+        import asyncio
+
+        while True:
+            if interrupt is not None and interrupt.is_set():
+                return None
+            now = time.perf_counter()
+            if now >= deadline:
+                return now
+            await asyncio.sleep(min(deadline - now, poll_interval))
+
+
+class VirtualClock(Clock):
+    """Simulated time that jumps straight to every deadline instead of waiting."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        """Initialize the virtual time."""
+        self.time = start
+
+    def now(self) -> float:
+        """Return the current virtual time."""
+        return self.time
+
+    def sleep_until(
+        self,
+        deadline: float,
+        spin_window: float,
+        interrupt: Optional[threading.Event] = None,
+    ) -> Optional[float]:
+        """Advance virtual time to ``deadline``; nothing blocks, so nothing is interrupted."""
+        if deadline > self.time:
+            self.time = deadline
+        return self.time
+
+    async def sleep_until_async(
+        self,
+        deadline: float,
+        interrupt: Optional[threading.Event] = None,
+        poll_interval: float = 0.05,
+    ) -> Optional[float]:
+        """Advance virtual time to ``deadline`` after letting other tasks run."""
+        import asyncio
+
+        await asyncio.sleep(0)
+        return self.sleep_until(deadline, 0.0, interrupt)
+
+
+# Seconds before a deadline that the real clock stops sleeping and spins.
+SPIN_WINDOW = 0.002
+
+
+class DeadlineScheduler:
+    """
+    Waits for absolute deadlines measured from a fixed start time.
+
+    Every deadline is relative to the same anchor, so sleep granularity and
+    time spent injecting keys never accumulate into drift. How each wait is
+    carried out is up to the clock: the real clock sleeps and then spins for
+    the last ``spin_window`` seconds, a virtual clock simply jumps ahead.
+    """
+
+    def __init__(self, spin_window: float = SPIN_WINDOW, clock: Optional[Clock] = None) -> None:
+        """Initialize the scheduler with a spin window in seconds and a clock."""
+        self.spin_window = spin_window
+        self.clock = clock if clock is not None else Clock()
+        self.start_time: float = 0.0
+        self._waits = 0
+        self._total_error = 0.0
+        self._max_error = 0.0
+        self._last_error = 0.0
+
+    def start(self) -> None:
+        """Anchor all following deadlines to the current time."""
+        self.start_time = self.clock.now()
+        self._waits = 0
+        self._total_error = 0.0
+        self._max_error = 0.0
+        self._last_error = 0.0
+
+    def shift(self, seconds: float) -> None:
+        """Move all remaining deadlines later, e.g. after a pause."""
+        self.start_time += seconds
+
+    def wait_until(
+        self, scheduled: float, interrupt: Optional[threading.Event] = None
+    ) -> Optional[float]:
+        """
+        Wait until ``scheduled`` seconds after start and return the lateness.
+
+        If ``interrupt`` is set before the deadline the wait ends early and
+        ``None`` is returned.
+        """
+        deadline = self.start_time + scheduled
+        now = self.clock.sleep_until(deadline, self.spin_window, interrupt)
+        if now is None:
+            return None
+        return self._record(now - deadline)
+
+    async def wait_until_async(
+        self,
+        scheduled: float,
+        interrupt: Optional[threading.Event] = None,
+        poll_interval: float = 0.05,
+    ) -> Optional[float]:
+        """Like ``wait_until``, but awaits the deadline on the running event loop."""
+        deadline = self.start_time + scheduled
+        now = await self.clock.sleep_until_async(deadline, interrupt, poll_interval)
+        if now is None:
+            return None
+        return self._record(now - deadline)
+
+    def _record(self, error: float) -> float:
+        """Add one wait's lateness to the precision statistics and return it."""
+        self._waits += 1
+        self._total_error += error
+        self._last_error = error
+        if error > self._max_error:
+            self._max_error = error
+        return error
+
+    def elapsed(self) -> float:
+        """Seconds since the (pause-adjusted) start time."""
+        return self.clock.now() - self.start_time
+
+    def report(self) -> dict[str, float]:
+        """Summarize achieved timing precision in milliseconds."""
+        waits = max(self._waits, 1)
+        return {
+            "mean_error_ms": self._total_error / waits * 1000,
+            "max_error_ms": self._max_error * 1000,
+            "drift_ms": self._last_error * 1000,
+        }
+
+
+class AsyncProgress:
+    """
+    Progress of an asynchronous typing session, as an async iterator.
+
+    Pass one to ``TypingEngine.type_text_async`` and iterate over it from
+    another task: it yields the progress in percent and ends with the
+    session. A slow reader only sees the latest value, never a backlog.
+    """
+
+    def __init__(self) -> None:
+        """Create an iterator that has not seen any progress yet."""
+        self.percent = 0.0
+        self._unread = False
+        self._closed = False
+        self._changed: Optional[asyncio.Event] = None
+
+    def update(self, percent: float) -> None:
+        """Publish new progress; called by the engine on the event loop."""
+        self.percent = percent
+        self._unread = True
+        if self._changed is not None:
+            self._changed.set()
+
+    def close(self) -> None:
+        """End the iteration once the remaining progress has been read."""
+        self._closed = True
+        if self._changed is not None:
+            self._changed.set()
+
+    def __aiter__(self) -> AsyncProgress:
+        """Iterate over progress updates."""
+        return self
+
+    async def __anext__(self) -> float:
+        """Wait for the next progress value in percent."""
+        import asyncio
+
+        while not self._unread:
+            if self._closed:
+                raise StopAsyncIteration
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            self._changed.clear()
+            await self._changed.wait()
+        self._unread = False
+        return self.percent
+
+
+class TypingEngine:
+    """
+    Advanced human-like typing simulation engine.
+
+    Handles realistic human typing simulation including variable timing,
+    realistic typos based on keyboard layout, automatic corrections,
+    fatigue simulation, and burst typing patterns.
+    """
+
+    TYPO_NEIGHBORS: dict[str, str] = {
+        "a": "sqwz",
+        "b": "vghn",
+        "c": "xdfv",
+        "d": "serfcx",
+        "e": "wsdr",
+        "f": "drtgvc",
+        "g": "ftyhbv",
+        "h": "gyujnb",
+        "i": "ujko",
+        "j": "huiknm",
+        "k": "jiolm",
+        "l": "kop",
+        "m": "njk",
+        "n": "bhjm",
+        "o": "iklp",
+        "p": "ol",
+        "q": "wa",
+        "r": "edft",
+        "s": "awedxz",
+        "t": "rfgy",
+        "u": "yhji",
+        "v": "cfgb",
+        "w": "qase",
+        "x": "zsdc",
+        "y": "tghu",
+        "z": "asx",
+    }
+
+    TYPO_ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+    FATIGUE_SPAN = 20000
+    PHASE_PUBLISH_INTERVAL = 0.25
+    CONTROL_POLL_INTERVAL = 0.05
+
+    def __init__(
+        self, backend: Optional[OutputBackend] = None, clock: Optional[Clock] = None
+    ) -> None:
+        """Initialize the typing engine, optionally with an output backend and clock."""
+        self._backend = backend
+        self.is_running: bool = False
+        self.is_paused: bool = False
+        self._stop_event: threading.Event = threading.Event()
+        self._pause_event: threading.Event = threading.Event()
+        self._pause_event.set()
+        self._wake_event: threading.Event = threading.Event()
+        self._control_requested: float = 0.0
+        self.control_latency: dict[str, float] = {}
+        self.progress_callback: Optional[Callable[[float], None]] = None
+        self.status_callback: Optional[Callable[[str], None]] = None
+        self.stats: dict[str, int] = {
+            "chars_typed": 0,
+            "chars_dropped": 0,
+            "typos_made": 0,
+            "words_completed": 0,
+            "key_events": 0,
+        }
+        self.scheduler = DeadlineScheduler(clock=clock)
+        self.timing: dict[str, float] = {}
+        self.calibration: Optional[Calibration] = None
+        self.trace: Optional[KeystrokeTrace] = None
+        self.plan_cache: Optional[PlanCache] = None
+        self.phases: dict[str, float] = {}
+        self.routes: dict[str, int] = {}
+        self.resume_point: tuple[int, bool] = (0, False)
+        self._paused_seconds = 0.0
+        # Time spent in the last build_plan, reported by the next session.
+        self._plan_seconds = 0.0
+
+    def reset_stats(self) -> None:
+        """Reset all typing statistics to zero."""
+        self.stats = {
+            "chars_typed": 0,
+            "chars_dropped": 0,
+            "typos_made": 0,
+            "words_completed": 0,
+            "key_events": 0,
+        }
+
+    def stop(self) -> None:
+        """Stop typing immediately."""
+        self._control_requested = time.perf_counter()
+        self._stop_event.set()
+        self._pause_event.set()
+        self._wake_event.set()
+        self.is_running = False
+
+    def pause(self) -> None:
+        """Pause typing at the current position."""
+        self._control_requested = time.perf_counter()
+        self.is_paused = True
+        self._pause_event.clear()
+        self._wake_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the last session was stopped before it finished."""
+        return self._stop_event.is_set()
+
+    @property
+    def position(self) -> int:
+        """Text offset up to which the current or last session has typed everything."""
+        return self.resume_point[0]
+
+    @property
+    def typo_pending(self) -> bool:
+        """Whether an uncorrected typo follows ``position``."""
+        return self.resume_point[1]
+
+    def resume(self) -> None:
+        """Resume typing from the paused position."""
+        self.is_paused = False
+        self._pause_event.set()
+
+    def _wait_for_deadline(self, scheduled: float) -> Optional[float]:
+        """
+        Wait for a scheduled time while staying responsive to Stop and Pause.
+
+        Time spent paused is added to the scheduler's start time so playback
+        resumes at the same pace instead of catching up. Returns the lateness
+        like ``DeadlineScheduler.wait_until``, or None once typing has been
+        stopped.
+        """
+        while True:
+            if self._stop_event.is_set():
+                self._acknowledge_control("stop_ms")
+                return None
+
+            if not self._pause_event.is_set():
+                self._acknowledge_control("pause_ms")
+                paused_at = self.scheduler.clock.now()
+                self._pause_event.wait()
+                paused = self.scheduler.clock.now() - paused_at
+                self.scheduler.shift(paused)
+                self._paused_seconds += paused
+                continue
+
+            lateness = self.scheduler.wait_until(scheduled, self._wake_event)
+            if lateness is not None:
+                self._control_requested = 0.0
+                return lateness
+            self._wake_event.clear()
+
+    async def _wait_for_deadline_async(self, scheduled: float) -> Optional[float]:
+        """
+        Await a scheduled time while staying responsive to Stop and Pause.
+
+        The asyncio counterpart of ``_wait_for_deadline``. Control requests
+        may come from any thread, so they are polled every
+        ``CONTROL_POLL_INTERVAL`` seconds rather than awaited.
+        """
+        import asyncio
+
+        while True:
+            if self._stop_event.is_set():
+                self._acknowledge_control("stop_ms")
+                return None
+
+            if not self._pause_event.is_set():
+                self._acknowledge_control("pause_ms")
+                paused_at = self.scheduler.clock.now()
+                while not self._pause_event.is_set():
+                    await asyncio.sleep(self.CONTROL_POLL_INTERVAL)
+                paused = self.scheduler.clock.now() - paused_at
+                self.scheduler.shift(paused)
+                self._paused_seconds += paused
+                continue
+
+            lateness = await self.scheduler.wait_until_async(
+                scheduled, self._wake_event, self.CONTROL_POLL_INTERVAL
+            )
+            if lateness is not None:
+                self._control_requested = 0.0
+                return lateness
+            self._wake_event.clear()
+
+    def _acknowledge_control(self, name: str) -> None:
+        """Record how long the worker took to honour a Stop or Pause request."""
+        if self._control_requested:
+            latency = (time.perf_counter() - self._control_requested) * 1000
+            self.control_latency[name] = latency
+            self._control_requested = 0.0
+
+    @property
+    def backend(self) -> OutputBackend:
+        """The output backend, defaulting to pyautogui on first use."""
+        if self._backend is None:
+            self._backend = PyAutoGUIBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: OutputBackend) -> None:
+        """Replace the output backend and drop its stale calibration."""
+        self._backend = backend
+        self.calibration = None
+
+    def calibrate(self, force: bool = False) -> Calibration:
+        """Measure key injection overhead and compensate for it during playback."""
+        self.calibration = calibrate_output(self.backend, force=force)
+        return self.calibration
+
+    def _get_typo_char(self, char: str) -> str:
+        """Get a realistic typo character based on keyboard layout."""
+        char_lower = char.lower()
+        if char_lower in self.TYPO_NEIGHBORS:
+            typo = random.choice(self.TYPO_NEIGHBORS[char_lower])
+            return typo.upper() if char.isupper() else typo
+        return random.choice(self.TYPO_ALPHABET)
+
+    def _char_complexity(self, char: str) -> float:
+        """Relative effort of a character: capitals and symbols take longer."""
+        complexity = 1.0
+
+        if char.isupper():
+            complexity *= 1.1
+
+        if char in "!@#$%^&*()_+-=[]{}|;:'\",.<>?/\\":
+            complexity *= 1.3
+
+        return complexity
+
+    def build_plan(
+        self,
+        text: str,
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+        seed: Optional[int] = None,
+        vectorized: bool = True,
+    ) -> KeystrokePlan:
+        """
+        Precompile text and settings into a keystroke plan.
+
+        With a ``seed`` the plan is reproducible and needs NumPy; it is then
+        generated with array operations unless ``vectorized`` is False.
+        Both ways produce the same plan. With a ``plan_cache`` attached, a
+        seeded plan for the same text and settings is reused instead;
+        unseeded plans are never cached, so every such session differs.
+        The time taken counts as planning in the next session's ``phases``.
+        """
+        start = time.perf_counter()
+        cache = self.plan_cache if seed is not None else None
+        if cache is not None:
+            key = (text_digest(text), PlanSettings(wpm, typo_rate, variability, burst_mode, seed))
+            cached = cache.get(key)
+            if cached is not None:
+                self._plan_seconds = time.perf_counter() - start
+                return cached
+
+        if seed is not None and vectorized:
+            from vectorized import build_plan_vectorized
+
+            plan = build_plan_vectorized(
+                self, text, wpm, typo_rate, variability, burst_mode, seed
+            )
+        else:
+            events = self._iter_plan_events(
+                (text,), len(text), wpm, typo_rate, variability, burst_mode, seed
+            )
+            plan = KeystrokePlan.from_events(events, len(text))
+
+        if cache is not None:
+            cache.put(key, plan)
+        self._plan_seconds = time.perf_counter() - start
+        return plan
+
+    def _iter_plan_events(
+        self,
+        chunks: Iterable[str],
+        total_chars: Optional[int],
+        wpm: int,
+        typo_rate: float,
+        variability: float,
+        burst_mode: bool,
+        seed: Optional[int] = None,
+        start_offset: int = 0,
+    ) -> Iterator[tuple[int, int, str, float]]:
+        """
+        Generate timed keystroke events with human-like characteristics.
+
+        Text is consumed in a single pass over ``iter_tokens`` and typed
+        exactly as written: every space becomes a Space press, every newline
+        an Enter, and other whitespace such as tabs is typed as a character.
+        The first press of a run of blanks is the pause between words;
+        indentation after it follows quickly. When the total length is unknown,
+        fatigue grows over ``FATIGUE_SPAN`` characters instead. Without a
+        seed, randomness comes from the global ``random`` module. Text that
+        continues a document at ``start_offset`` gets offsets, and fatigue,
+        from that position on.
+        """
+        if seed is not None:
+            yield from self._iter_seeded_plan_events(
+                chunks, total_chars, wpm, typo_rate, variability, burst_mode, seed, start_offset
+            )
+            return
+
+        chars_per_minute = wpm * 5
+        base_delay = 60.0 / chars_per_minute
+        fatigue_span = total_chars or self.FATIGUE_SPAN
+
+        # Hot loop: bind everything locally and yield plain tuples in KeyEvent
+        # field order; wrapping each one in a KeyEvent costs more than planning it.
+        rand = random.random
+        uniform = random.uniform
+        typo_char = self._get_typo_char
+        char_complexity = self._char_complexity
+        complexity_cache: dict[str, float] = {}
+        CHAR, TYPO, BACKSPACE = KeyAction.CHAR, KeyAction.TYPO, KeyAction.BACKSPACE
+        SPACE, ENTER = KeyAction.SPACE, KeyAction.ENTER
+        WORD, BLANK = TokenKind.WORD, TokenKind.BLANK
+
+        elapsed = 0.0
+        in_word = in_blank = False
+        fatigue_factor = 1.0
+        word_scale = 1.0
+
+        for start, kind, token in iter_tokens(chunks, start_offset):
+            if kind == WORD:
+                if not in_word:
+                    fatigue_factor = 1 + min(start / fatigue_span, 1.0) * 0.15
+                    burst_active = burst_mode and rand() < 0.15
+                    word_scale = (0.6 if burst_active else 1.0) * fatigue_factor
+                    in_word = True
+                    in_blank = False
+
+                for offset, char in enumerate(token, start):
+                    if rand() < typo_rate:
+                        yield (offset, TYPO, typo_char(char), elapsed)
+                        elapsed += uniform(0.15, 0.35)
+                        yield (offset, BACKSPACE, "backspace", elapsed)
+                        elapsed += uniform(0.05, 0.12)
+
+                    yield (offset, CHAR, char, elapsed)
+
+                    complexity = complexity_cache.get(char)
+                    if complexity is None:
+                        complexity = complexity_cache[char] = char_complexity(char)
+                    delay = base_delay * complexity * (1 + variability * (2 * rand() - 1))
+                    if rand() < 0.02:
+                        delay += uniform(0.1, 0.3)
+                    elapsed += delay * word_scale
+            elif kind == BLANK:
+                for offset, char in enumerate(token, start):
+                    if char == " ":
+                        yield (offset, SPACE, "space", elapsed)
+                    else:
+                        yield (offset, CHAR, char, elapsed)
+                    spacing = uniform(0.4, 0.8) if in_blank else uniform(1.5, 2.5)
+                    elapsed += base_delay * spacing * fatigue_factor
+                    in_blank = True
+                in_word = False
+            else:
+                yield (start, ENTER, "enter", elapsed)
+                elapsed += uniform(0.8, 1.8)
+                in_word = in_blank = False
+
+    def _seeded_typo_char(self, char: str, draw: float) -> str:
+        """Pick a typo character for ``char`` from a uniform draw."""
+        neighbors = self.TYPO_NEIGHBORS.get(char.lower())
+        if neighbors is None:
+            return self.TYPO_ALPHABET[int(draw * len(self.TYPO_ALPHABET))]
+        typo = neighbors[int(draw * len(neighbors))]
+        return typo.upper() if char.isupper() else typo
+
+    def _iter_seeded_plan_events(
+        self,
+        chunks: Iterable[str],
+        total_chars: Optional[int],
+        wpm: int,
+        typo_rate: float,
+        variability: float,
+        burst_mode: bool,
+        seed: int,
+        start_offset: int = 0,
+    ) -> Iterator[tuple[int, int, str, float]]:
+        """
+        Generate the same events as ``_iter_plan_events`` from a seeded generator.
+
+        Every character consumes one row of ``SeedDraw.COUNT`` draws from a
+        ``numpy.random.Generator``, which keeps this scalar planner and the
+        vectorised one in ``vectorized.py`` in lockstep. Tokens are matched
+        per block so each one can find its rows by position.
+        """
+        import numpy as np
+
+        generator = np.random.default_rng(seed)
+        base_delay = 60.0 / (wpm * 5)
+        fatigue_span = total_chars or self.FATIGUE_SPAN
+
+        typo_char = self._seeded_typo_char
+        char_complexity = self._char_complexity
+        complexity_cache: dict[str, float] = {}
+        CHAR, TYPO, BACKSPACE = KeyAction.CHAR, KeyAction.TYPO, KeyAction.BACKSPACE
+        SPACE, ENTER = KeyAction.SPACE, KeyAction.ENTER
+        WORD, BLANK = TokenKind.WORD, TokenKind.BLANK
+        finditer = TOKEN_PATTERN.finditer
+        TYPO_DRAW, BURST_DRAW = SeedDraw.TYPO, SeedDraw.BURST
+
+        block_start = start_offset
+        elapsed = 0.0
+        in_word = in_blank = False
+        fatigue_factor = 1.0
+        word_scale = 1.0
+
+        for block in self._seed_blocks(chunks):
+            rows = generator.random((len(block), SeedDraw.COUNT)).tolist()
+            for match in finditer(block):
+                index, end = match.span()
+                start = block_start + index
+                kind = match.lastindex
+                token = match.group()
+                if kind == WORD:
+                    if not in_word:
+                        fatigue_factor = 1 + min(start / fatigue_span, 1.0) * 0.15
+                        burst_active = burst_mode and rows[index][BURST_DRAW] < 0.15
+                        word_scale = (0.6 if burst_active else 1.0) * fatigue_factor
+                        in_word = True
+                        in_blank = False
+
+                    # Row layout follows the SeedDraw columns.
+                    for offset, char, (
+                        typo_draw,
+                        typo_char_draw,
+                        hold_draw,
+                        backspace_draw,
+                        jitter_draw,
+                        think_draw,
+                        think_length_draw,
+                        _,
+                        _,
+                    ) in zip(range(start, start + len(token)), token, rows[index:end]):
+                        if typo_draw < typo_rate:
+                            yield (offset, TYPO, typo_char(char, typo_char_draw), elapsed)
+                            elapsed += 0.15 + (0.35 - 0.15) * hold_draw
+                            yield (offset, BACKSPACE, "backspace", elapsed)
+                            elapsed += 0.05 + (0.12 - 0.05) * backspace_draw
+
+                        yield (offset, CHAR, char, elapsed)
+
+                        complexity = complexity_cache.get(char)
+                        if complexity is None:
+                            complexity = complexity_cache[char] = char_complexity(char)
+                        jitter = 2 * jitter_draw - 1
+                        delay = base_delay * complexity * (1 + variability * jitter)
+                        if think_draw < 0.02:
+                            delay += 0.1 + (0.3 - 0.1) * think_length_draw
+                        elapsed += delay * word_scale
+                elif kind == BLANK:
+                    for offset, char, row in zip(
+                        range(start, start + len(token)), token, rows[index:end]
+                    ):
+                        if char == " ":
+                            yield (offset, SPACE, "space", elapsed)
+                        else:
+                            yield (offset, CHAR, char, elapsed)
+                        if in_blank:
+                            spacing = 0.4 + (0.8 - 0.4) * row[SeedDraw.SPACE]
+                        else:
+                            spacing = 1.5 + (2.5 - 1.5) * row[SeedDraw.SPACE]
+                        elapsed += base_delay * spacing * fatigue_factor
+                        in_blank = True
+                    in_word = False
+                else:
+                    # Newlines draw their pause from the typo column.
+                    yield (start, ENTER, "enter", elapsed)
+                    elapsed += 0.8 + (1.8 - 0.8) * rows[index][TYPO_DRAW]
+                    in_word = in_blank = False
+            block_start += len(block)
+
+    @staticmethod
+    def _seed_blocks(chunks: Iterable[str]) -> Iterator[str]:
+        """Split chunks into blocks of at most ``SeedDraw.BLOCK_SIZE`` characters."""
+        size = SeedDraw.BLOCK_SIZE
+        for chunk in chunks:
+            if len(chunk) <= size:
+                yield chunk
+            else:
+                for start in range(0, len(chunk), size):
+                    yield chunk[start : start + size]
+
+    def play_plan(self, plan: KeystrokePlan) -> None:
+        """Play back a precompiled keystroke plan."""
+        total_chars = max(plan.total_chars, 1)
+        self._play(plan.iter_events(), lambda offset: (offset + 1) / total_chars)
+
+    def type_stream(
+        self,
+        stream: Union[str, IO[str], IO[bytes]],
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+        total_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        normalize_newlines: bool = False,
+    ) -> None:
+        """
+        Type from a file object or stdin without reading it all first.
+
+        Planning and playback are interleaved, so typing starts as soon as
+        the first chunk has been read. Binary streams report progress as
+        bytes consumed against the file size when it is known. With
+        ``normalize_newlines``, CRLF and CR line endings are typed as Enter.
+
+        The number of characters in a file is not known up front, so fatigue
+        grows over ``FATIGUE_SPAN`` characters instead of the whole text, and
+        a seed gives different timing than ``build_plan`` for the same text.
+        Text passed as a string is planned exactly like ``build_plan`` does.
+        """
+        source = TextSource(stream, total_size, normalize_newlines=normalize_newlines)
+        total_chars = None
+        if isinstance(stream, str):
+            # Normalising only ever turns a CRLF pair into one newline.
+            total_chars = len(stream) - stream.count("\r\n") * normalize_newlines
+        events = self._iter_plan_events(
+            source.chunks(), total_chars, wpm, typo_rate, variability, burst_mode, seed
+        )
+        self._play(events, source.fraction)
+
+    def _play(
+        self,
+        events: Iterable[tuple[int, int, str, float]],
+        fraction: Callable[[int], float],
+    ) -> None:
+        """Play keystroke events back, blocking the calling thread until done."""
+        session = self._session(events, fraction, self.progress_callback)
+        wait_until = self.scheduler.wait_until
+        wait_for_deadline = self._wait_for_deadline
+        wake_event = self._wake_event
+        try:
+            deadline = next(session)
+            while True:
+                # Without a pending Stop or Pause request the deadline can be
+                # awaited directly; otherwise take the slow, control-aware path.
+                lateness = None if self._control_requested else wait_until(deadline, wake_event)
+                if lateness is None:
+                    lateness = wait_for_deadline(deadline)
+                deadline = session.send(lateness)
+        except StopIteration:
+            pass
+        finally:
+            session.close()
+
+    async def _play_async(
+        self,
+        events: Iterable[tuple[int, int, str, float]],
+        fraction: Callable[[int], float],
+        progress: Optional[AsyncProgress] = None,
+    ) -> None:
+        """
+        Play keystroke events back on the running event loop.
+
+        Cancelling the task stops typing exactly like ``stop``: the position
+        is recorded and the backend drained before the cancellation goes on.
+        """
+        import asyncio
+
+        callback = self.progress_callback
+
+        def publish(percent: float) -> None:
+            if callback:
+                callback(percent)
+            if progress is not None:
+                progress.update(percent)
+
+        session = self._session(events, fraction, publish if progress is not None else callback)
+        try:
+            deadline = next(session)
+            while True:
+                try:
+                    lateness = await self._wait_for_deadline_async(deadline)
+                except asyncio.CancelledError:
+                    self.stop()
+                    with contextlib.suppress(StopIteration):
+                        session.send(None)
+                    raise
+                deadline = session.send(lateness)
+        except StopIteration:
+            pass
+        finally:
+            session.close()
+            if progress is not None:
+                progress.close()
+
+    def _session(
+        self,
+        events: Iterable[tuple[int, int, str, float]],
+        fraction: Callable[[int], float],
+        progress_callback: Optional[Callable[[float], None]],
+    ) -> Generator[float, Optional[float], None]:
+        """
+        The playback loop shared by the blocking and the asyncio API.
+
+        Yields the deadline of each keystroke, on the scheduler's clock, and
+        expects to be sent how late the wait for it ended, or None once
+        typing has been stopped. Everything else, from injecting the keys
+        to progress reporting, happens here. Progress goes to
+        ``progress_callback`` as a percentage of ``fraction``.
+
+        ``resume_point`` is refreshed together with ``phases`` and once more
+        when playback ends: it pairs the text offset up to which everything
+        has been typed, which is where an interrupted session can be
+        resumed, with whether an uncorrected typo follows it. It is replaced
+        as a whole, so other threads never see the halves of two updates.
+        ``routes`` counts how the backend delivered the written characters,
+        and characters it had to drop are not counted as typed. The
+        backend is drained when playback ends for any reason, so a held
+        Shift is always released.
+        """
+        self._stop_event.clear()
+        self._wake_event.clear()
+        self.is_running = True
+        self.control_latency = {}
+        self._paused_seconds = 0.0
+        planned_ahead = self._plan_seconds
+        self._plan_seconds = 0.0
+        self.phases = {}
+        self.resume_point = (0, False)
+        self.reset_stats()
+        routes_before = self.backend.route_counts()
+        key_events_before = self.backend.key_events
+
+        stats = self.stats
+        scheduler = self.scheduler
+        status_callback = self.status_callback
+        overhead = self.calibration.call_overhead if self.calibration else 0.0
+        backend = self.backend
+        write = backend.write
+        press = backend.press
+        navigate = backend.navigate
+        flush = backend.flush
+        perf_counter = time.perf_counter
+        publish_interval = self.PHASE_PUBLISH_INTERVAL
+        trace = self.trace
+        if trace is not None:
+            trace.clear()
+        events_injected = 0
+        inject_max = 0.0
+        scheduled = 0.0
+        offset = action = -1
+        word_open = False
+
+        # Wall time buckets; every stretch of the loop lands in exactly one.
+        backend_time = 0.0
+        wait_time = 0.0
+        callback_time = 0.0
+        planning_time = planned_ahead
+
+        if status_callback:
+            status_callback("Typing started...")
+
+        scheduler.start()
+        mark = next_publish = perf_counter()
+        # A plan built up front was planned for this session; the wait
+        # between planning and typing, such as a countdown, is not counted.
+        session_start = mark - planned_ahead
+
+        try:
+            for offset, action, key, scheduled in events:
+                wait_start = perf_counter()
+                planning_time += wait_start - mark
+
+                deadline = scheduled - overhead
+                lateness = yield deadline
+                if lateness is None:
+                    # Everything before this unplayed event has been typed;
+                    # an unplayed Backspace means a typo is still showing.
+                    self.resume_point = (offset, action == KeyAction.BACKSPACE)
+                    break
+
+                inject_start = perf_counter()
+                wait_time += inject_start - wait_start
+                if action == KeyAction.CHAR or action == KeyAction.TYPO:
+                    write(key)
+                elif action >= KeyAction.DOC_START:
+                    navigate(key)
+                else:
+                    press(key)
+                flush()
+                inject_end = perf_counter()
+                inject_time = inject_end - inject_start
+                backend_time += inject_time
+                events_injected += 1
+                if inject_time > inject_max:
+                    inject_max = inject_time
+
+                if action == KeyAction.TYPO:
+                    stats["typos_made"] += 1
+                elif action <= KeyAction.ENTER and action != KeyAction.BACKSPACE:
+                    # A character of the text is done; whitespace ends a word.
+                    if action == KeyAction.CHAR:
+                        stats["chars_typed"] += 1
+                    if action == KeyAction.CHAR and not key.isspace():
+                        word_open = True
+                    elif word_open:
+                        stats["words_completed"] += 1
+                        word_open = False
+                    if action == KeyAction.ENTER and status_callback:
+                        status_callback("Typing... (new paragraph)")
+                    if progress_callback:
+                        progress_callback(fraction(offset) * 100)
+
+                if trace is not None:
+                    # Times are on the scheduler's clock: the wait ended
+                    # ``lateness`` after the overhead-compensated deadline.
+                    inject_at = deadline + lateness
+                    trace.record(
+                        offset, action, scheduled, inject_at, inject_at + inject_time, lateness
+                    )
+
+                mark = perf_counter()
+                callback_time += mark - inject_end
+                if mark >= next_publish:
+                    next_publish = mark + publish_interval
+                    self.phases = self._phase_report(
+                        mark - session_start, backend_time, wait_time, callback_time, planning_time
+                    )
+                    # A typo or its correction leaves the current character pending.
+                    typo = action == KeyAction.TYPO
+                    pending = typo or action == KeyAction.BACKSPACE
+                    self.resume_point = (offset if pending else offset + 1, typo)
+            else:
+                self.resume_point = (offset + 1, False)
+                if progress_callback:
+                    progress_callback(100.0)
+        finally:
+            # Deliver characters the backend held back, such as a run to
+            # paste, and never leave Shift held, even if playback failed.
+            drain_start = perf_counter()
+            backend.drain()
+            flush()
+            backend_time += perf_counter() - drain_start
+
+        self.routes = {
+            route: count - routes_before.get(route, 0)
+            for route, count in backend.route_counts().items()
+        }
+        dropped = self.routes.get(CharRoute.DROP, 0)
+        stats["chars_dropped"] = dropped
+        stats["chars_typed"] -= dropped
+        stats["key_events"] = backend.key_events - key_events_before
+
+        self.is_running = False
+        if word_open:
+            stats["words_completed"] += 1
+        self.phases = self._phase_report(
+            perf_counter() - session_start, backend_time, wait_time, callback_time, planning_time
+        )
+        self.timing = self._timing_report(scheduled, scheduler.elapsed())
+        self.timing["inject_mean_ms"] = backend_time / max(events_injected, 1) * 1000
+        self.timing["inject_max_ms"] = inject_max * 1000
+
+        if status_callback:
+            if self._stop_event.is_set():
+                status_callback("Typing stopped")
+            else:
+                status_callback("Typing complete!")
+
+    def _phase_report(
+        self,
+        wall: float,
+        backend: float,
+        wait: float,
+        callbacks: float,
+        planning: float,
+    ) -> dict[str, float]:
+        """Split a session's wall time into seconds per phase."""
+        paused = self._paused_seconds
+        sleep = max(wait - paused, 0.0)
+        return {
+            "wall_s": wall,
+            "backend_s": backend,
+            "sleep_s": sleep,
+            "callbacks_s": callbacks,
+            "planning_s": planning,
+            "paused_s": paused,
+            "other_s": max(wall - backend - sleep - callbacks - planning - paused, 0.0),
+        }
+
+    def _timing_report(self, planned: float, elapsed: float) -> dict[str, float]:
+        """Compare the achieved typing rate with the planned one."""
+        report = self.scheduler.report()
+        words = self.stats["chars_typed"] / 5
+        report["elapsed_s"] = elapsed
+        report["effective_wpm"] = words / elapsed * 60 if elapsed > 0 else 0.0
+        report["planned_wpm"] = words / planned * 60 if planned > 0 else 0.0
+        report.update(self.control_latency)
+        return report
+
+    def dry_run(
+        self,
+        text: str,
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+        samples: int = 20,
+        seed: Optional[int] = None,
+    ) -> DryRunReport:
+        """
+        Simulate typing a text without touching the keyboard.
+
+        Planned events already carry their virtual timestamps, so the session
+        is replayed by walking the event stream once instead of waiting on
+        any clock. The timeline has ``samples`` evenly spaced points with the
+        typing pace of each stretch, which shows fatigue and burst effects.
+        """
+        total_chars = max(len(text), 1)
+        step = max(total_chars // max(samples, 1), 1)
+        next_mark = step
+        timeline: list[TimelinePoint] = []
+        keystrokes = chars = typos = words = 0
+        word_open = False
+        last_time = scheduled = 0.0
+        last_chars = 0
+        CHAR, TYPO = KeyAction.CHAR, KeyAction.TYPO
+        SPACE, ENTER = KeyAction.SPACE, KeyAction.ENTER
+
+        events = self._iter_plan_events(
+            (text,), len(text), wpm, typo_rate, variability, burst_mode, seed
+        )
+        for offset, action, key, scheduled in events:
+            keystrokes += 1
+            if action == TYPO:
+                typos += 1
+            elif action == CHAR and not key.isspace():
+                chars += 1
+                word_open = True
+            elif action == CHAR or action == SPACE or action == ENTER:
+                # Whitespace ends the word being typed.
+                chars += action == CHAR
+                words += word_open
+                word_open = False
+            if offset >= next_mark:
+                span = scheduled - last_time
+                pace = (chars - last_chars) / 5 / span * 60 if span > 0 else 0.0
+                timeline.append(TimelinePoint(scheduled, offset / total_chars * 100, chars, pace))
+                next_mark = offset + step
+                last_time, last_chars = scheduled, chars
+
+        span = scheduled - last_time
+        pace = (chars - last_chars) / 5 / span * 60 if span > 0 else 0.0
+        timeline.append(TimelinePoint(scheduled, 100.0, chars, pace))
+
+        return DryRunReport(
+            duration=scheduled,
+            keystrokes=keystrokes,
+            chars_typed=chars,
+            typos=typos,
+            words=words + word_open,
+            timeline=tuple(timeline),
+        )
+
+    def type_text(
+        self,
+        text: str,
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+        seed: Optional[int] = None,
+        normalize_newlines: bool = False,
+    ) -> None:
+        """
+        Type text with human-like characteristics.
+
+        Whitespace is typed exactly as it is. With ``normalize_newlines``,
+        CRLF and CR line endings are typed as a single Enter; otherwise a CR
+        is typed as a character of its own.
+        """
+        if normalize_newlines:
+            text = unix_newlines(text)
+        self.play_plan(self.build_plan(text, wpm, typo_rate, variability, burst_mode, seed))
+
+    async def play_plan_async(
+        self, plan: KeystrokePlan, progress: Optional[AsyncProgress] = None
+    ) -> None:
+        """Play back a precompiled keystroke plan on the running event loop."""
+        total_chars = max(plan.total_chars, 1)
+        await self._play_async(
+            plan.iter_events(), lambda offset: (offset + 1) / total_chars, progress
+        )
+
+    async def type_text_async(
+        self,
+        text: str,
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+        seed: Optional[int] = None,
+        normalize_newlines: bool = False,
+        progress: Optional[AsyncProgress] = None,
+    ) -> None:
+        """
+        Type text like ``type_text``, awaiting each keystroke on the event loop.
+
+        The keystrokes and their timing are the same as ``type_text``
+        would produce, but they are planned while typing, so a long text
+        never blocks the loop. No thread is needed, so many sessions, each
+        with its own engine, can share one loop. Progress is published to
+        ``progress`` if given. Cancelling the task stops typing.
+        """
+        if normalize_newlines:
+            text = unix_newlines(text)
+        total_chars = max(len(text), 1)
+        events = self._iter_plan_events(
+            (text,), len(text), wpm, typo_rate, variability, burst_mode, seed
+        )
+        await self._play_async(events, lambda offset: (offset + 1) / total_chars, progress)
+
+    def type_update(
+        self,
+        old_text: str,
+        new_text: str,
+        wpm: int = 60,
+        typo_rate: float = 0.05,
+        variability: float = 0.3,
+        burst_mode: bool = False,
+    ) -> UpdateReport:
+        """
+        Revise an already typed ``old_text`` into ``new_text``.
+
+        Only the differences are typed, starting with the cursor at the end
+        of the old text. Returns what was saved against typing from scratch.
+        """
+        from update import build_update_plan
+
+        plan, report = build_update_plan(
+            self, old_text, new_text, wpm, typo_rate, variability, burst_mode
+        )
+        self.play_plan(plan)
+        return report
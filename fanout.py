@@ -0,0 +1,487 @@
+"""
+Phantom Keys - Multi-Display Fan-Out
+
+Types texts on many X displays at once, such as a row of Xvfb servers,
+to load-test text entry. Every display gets its own worker process with
+its own engine and XTest connection, so sessions never share a GIL.
+
+Usage: python fanout.py FILE [FILE ...] --displays :10-:33 [options]
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.managers import SyncManager
+from typing import Any, Iterator, NamedTuple, Optional, Sequence
+
+from backends import create_backend
+from engine import SPIN_WINDOW, PlanSettings, TypingEngine, unix_newlines
+from tracing import KeystrokeTrace, percentile
+
+
+# Seconds each worker gets to connect and plan before the shared start.
+WORKER_STARTUP = 1.0
+
+# How long each warm-up task holds its worker, so they land on different ones.
+WARM_UP_HOLD = 0.1
+
+# How often the runner checks for an interrupt while displays are typing.
+INTERRUPT_POLL = 0.1
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+class FanoutJob(NamedTuple):
+    """One text to type on one display."""
+
+    display: str
+    text: str
+    settings: PlanSettings
+    backend: str = "xtest"
+
+
+@dataclass(frozen=True)
+class DisplayResult:
+    """How typing went on one display."""
+
+    display: str
+    completed: bool = False
+    error: str = ""
+    chars_typed: int = 0
+    key_events: int = 0
+    typos_made: int = 0
+    elapsed_s: float = 0.0
+    start_skew_s: float = 0.0
+    lateness_ms: array = field(default_factory=lambda: array("d"))
+
+    @property
+    def failed(self) -> bool:
+        """Whether the session raised instead of typing its text."""
+        return bool(self.error)
+
+    @property
+    def chars_per_second(self) -> float:
+        """Characters delivered per second of typing."""
+        return self.chars_typed / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> dict[str, Any]:
+        """Throughput and lateness percentiles of this display."""
+        return {
+            "display": self.display,
+            "completed": self.completed,
+            "error": self.error,
+            "chars_typed": self.chars_typed,
+            "key_events": self.key_events,
+            "typos_made": self.typos_made,
+            "elapsed_s": self.elapsed_s,
+            "start_skew_ms": self.start_skew_s * 1000,
+            "chars_per_second": self.chars_per_second,
+            "wpm": self.chars_per_second * 60 / 5,
+            **lateness_summary(self.lateness_ms),
+        }
+
+
+def lateness_summary(values: Sequence[float]) -> dict[str, float]:
+    """Lateness percentiles in milliseconds, keyed like the trace summary."""
+    ordered = list(values)
+    summary = {
+        f"lateness_{name}_ms": percentile(ordered, fraction) for name, fraction in PERCENTILES
+    }
+    summary["lateness_max_ms"] = max(ordered, default=0.0)
+    return summary
+
+
+@dataclass
+class FanoutReport:
+    """Results of every display in a fan-out run."""
+
+    results: list[DisplayResult]
+    wall_s: float
+    workers: int
+
+    @property
+    def failures(self) -> list[DisplayResult]:
+        """Displays whose session raised or whose worker died."""
+        return [result for result in self.results if result.failed]
+
+    def aggregate(self) -> dict[str, Any]:
+        """Combined throughput over the run's wall time, and pooled lateness."""
+        chars = sum(result.chars_typed for result in self.results)
+        key_events = sum(result.key_events for result in self.results)
+        lateness: list[float] = []
+        for result in self.results:
+            lateness.extend(result.lateness_ms)
+        wall = max(self.wall_s, 1e-9)
+        return {
+            "displays": len(self.results),
+            "workers": self.workers,
+            "completed": sum(result.completed for result in self.results),
+            "failed": len(self.failures),
+            "chars_typed": chars,
+            "key_events": key_events,
+            "wall_s": self.wall_s,
+            "chars_per_second": chars / wall,
+            "key_events_per_second": key_events / wall,
+            "max_start_skew_ms": max(
+                (result.start_skew_s * 1000 for result in self.results), default=0.0
+            ),
+            **lateness_summary(lateness),
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the report to JSON-compatible data."""
+        return {
+            "aggregate": self.aggregate(),
+            "displays": [result.summary() for result in self.results],
+        }
+
+
+def _ignore_interrupts() -> None:
+    """Keep Ctrl+C from killing a pool worker or the manager between jobs."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+@contextmanager
+def _spawning_shielded() -> Iterator[None]:
+    """
+    Start child processes with Ctrl+C ignored, without losing one meanwhile.
+
+    Children inherit the ignored signal, so Ctrl+C cannot kill them while
+    their interpreter starts. Here it is also blocked, so one that arrives
+    is held back and delivered to the usual handler afterwards.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    # The first spawn starts the resource tracker, which unblocks Ctrl+C
+    # again when it is up; a Ctrl+C after that would be ignored and lost.
+    resource_tracker.ensure_running()
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
+    handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, handler)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+
+
+def _warm_up() -> int:
+    """Keep a freshly spawned worker busy briefly; returns its process id."""
+    time.sleep(WARM_UP_HOLD)
+    return os.getpid()
+
+
+def _drive_display(
+    job: FanoutJob, start_at: float, spin_window: float, stop: threading.Event
+) -> DisplayResult:
+    """
+    Type one job in a worker process and measure it.
+
+    The plan is built and the backend calibrated before the shared start
+    time, so every display starts typing at once. Ctrl+C stops the session
+    between keystrokes and the partial result is still returned, and so
+    does setting ``stop``, which is checked every ``INTERRUPT_POLL``. A
+    job that starts after the run was stopped, or is interrupted before
+    it types, returns without typing anything.
+    """
+    engine = TypingEngine()
+    interrupted = threading.Event()
+    finished = threading.Event()
+
+    def interrupt(*_: Any) -> None:
+        interrupted.set()
+        engine.stop()
+
+    def watch_stop() -> None:
+        while not finished.is_set():
+            if stop.wait(INTERRUPT_POLL):
+                interrupt()
+                return
+
+    signal.signal(signal.SIGINT, interrupt)
+    watcher = threading.Thread(target=watch_stop, daemon=True)
+    watcher.start()
+    backend = None
+    try:
+        if stop.is_set():
+            return DisplayResult(job.display)
+        if job.backend == "xtest":
+            backend = create_backend("xtest", display=job.display)
+        else:
+            backend = create_backend(job.backend)
+        engine.backend = backend
+        engine.scheduler.spin_window = spin_window
+        plan = engine.build_plan(job.text, *job.settings)
+        engine.trace = KeystrokeTrace(max(len(plan), 1))
+        engine.calibrate()
+
+        delay = start_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        skew = time.time() - start_at
+        if interrupted.is_set() or stop.is_set():
+            return DisplayResult(job.display)
+        engine.play_plan(plan)
+    except Exception as error:
+        return DisplayResult(job.display, error=f"{type(error).__name__}: {error}")
+    finally:
+        finished.set()
+        watcher.join()
+        if backend is not None:
+            backend.close()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    stats = engine.stats
+    return DisplayResult(
+        job.display,
+        completed=not engine.stopped,
+        chars_typed=stats["chars_typed"],
+        key_events=stats["key_events"],
+        typos_made=stats["typos_made"],
+        elapsed_s=engine.timing["elapsed_s"],
+        start_skew_s=skew,
+        lateness_ms=array("d", (record.lateness * 1000 for record in engine.trace)),
+    )
+
+
+def run_fanout(
+    jobs: Sequence[FanoutJob],
+    workers: Optional[int] = None,
+    start_delay: float = WORKER_STARTUP,
+    interrupt: Optional[threading.Event] = None,
+) -> FanoutReport:
+    """
+    Type every job on its display in parallel and collect the results.
+
+    By default there is one worker process per job. All workers are
+    started first, and typing begins ``start_delay`` seconds after the
+    last one is ready. Sessions mostly sleep
+    between keystrokes, so dozens of workers fit on a few cores; when
+    there are more workers than cores, deadlines are met by sleeping alone
+    instead of spinning for the last moment, so no worker burns a core
+    another one needs. With fewer workers than jobs, the remaining jobs
+    start as workers free up. A worker that dies is reported as a failure
+    of its display.
+
+    Setting ``interrupt`` stops the run: jobs that have not started are
+    cancelled or return at once, and running ones stop when their worker
+    gets Ctrl+C, which the terminal sends to the whole process group.
+    Workers ignore Ctrl+C except while a job can handle it.
+    """
+    workers = workers or len(jobs) or 1
+    spin_window = 0.0 if workers > (os.cpu_count() or 1) else SPIN_WINDOW
+
+    results: dict[int, DisplayResult] = {}
+    # Spawned workers do not inherit the parent's threads, locks or X connections.
+    context = multiprocessing.get_context("spawn")
+    manager = SyncManager(ctx=context)
+    with _spawning_shielded():
+        manager.start(_ignore_interrupts)
+    try:
+        stop = manager.Event()
+        with ProcessPoolExecutor(
+            workers, mp_context=context, initializer=_ignore_interrupts
+        ) as pool:
+            # Starting dozens of interpreters takes seconds, so the shared
+            # start is only set once every worker is up.
+            with _spawning_shielded():
+                for future in [pool.submit(_warm_up) for _ in range(workers)]:
+                    future.result()
+            start_at = time.time() + start_delay
+            futures = {
+                pool.submit(_drive_display, job, start_at, spin_window, stop): index
+                for index, job in enumerate(jobs)
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, INTERRUPT_POLL, FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except CancelledError:
+                        results[index] = DisplayResult(jobs[index].display)
+                    except BrokenProcessPool:
+                        results[index] = DisplayResult(
+                            jobs[index].display, error="Worker process died"
+                        )
+                if interrupt is not None and interrupt.is_set() and not stop.is_set():
+                    stop.set()
+                    for future in pending:
+                        future.cancel()
+    finally:
+        manager.shutdown()
+    wall = max(time.time() - start_at, 0.0)
+    return FanoutReport([results[index] for index in range(len(jobs))], wall, workers)
+
+
+def parse_displays(spec: str) -> list[str]:
+    """Expand ":1,:2" and ":10-:13" (or ":10-13") into a list of display names."""
+    displays: list[str] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        if not dash:
+            displays.append(part)
+            continue
+        try:
+            low, high = int(first.lstrip(":")), int(last.lstrip(":"))
+        except ValueError:
+            raise ValueError(f"Invalid display range '{part}'") from None
+        if high < low:
+            raise ValueError(f"Invalid display range '{part}'")
+        displays.extend(f":{number}" for number in range(low, high + 1))
+    return displays
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser; typing defaults match the GUI sliders."""
+    parser = argparse.ArgumentParser(
+        prog="phantom-keys-fanout",
+        description="Type texts on many X displays in parallel.",
+    )
+    parser.add_argument("files", nargs="+", help="text files, assigned to displays in turn")
+    parser.add_argument(
+        "--displays",
+        required=True,
+        help='X displays to drive, e.g. ":1,:2" or ":10-:33"',
+    )
+    parser.add_argument("--wpm", type=int, default=55, help="typing speed (default: 55)")
+    parser.add_argument(
+        "--typo-rate", type=float, default=3, help="typo rate in percent (default: 3)"
+    )
+    parser.add_argument(
+        "--variability",
+        type=float,
+        default=35,
+        help="timing variability in percent (default: 35)",
+    )
+    parser.add_argument(
+        "--no-burst",
+        dest="burst",
+        action="store_false",
+        help="disable occasional speed bursts",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="reproducible timing; display N uses seed + N (requires NumPy)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("xtest", "null"),
+        default="xtest",
+        help="xtest, or null to measure the runner without any display (default: xtest)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="worker processes (default: one per display)",
+    )
+    parser.add_argument(
+        "--start-delay",
+        type=float,
+        default=WORKER_STARTUP,
+        help=f"seconds for workers to get ready before typing (default: {WORKER_STARTUP:g})",
+    )
+    parser.add_argument("--json", metavar="FILE", help="also write the full report as JSON")
+    return parser
+
+
+def print_report(report: FanoutReport) -> None:
+    """Print per-display results and the aggregate."""
+    print(
+        f"{'display':>10} {'status':>9} {'chars':>8} {'chars/s':>8} {'WPM':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for result in report.results:
+        summary = result.summary()
+        status = "failed" if result.failed else "done" if result.completed else "stopped"
+        print(
+            f"{result.display:>10} {status:>9} {result.chars_typed:>8} "
+            f"{result.chars_per_second:>8.1f} {summary['wpm']:>6.0f} "
+            f"{summary['lateness_p50_ms']:>8.2f} {summary['lateness_p95_ms']:>8.2f} "
+            f"{summary['lateness_p99_ms']:>8.2f} {summary['lateness_max_ms']:>8.2f}"
+        )
+    total = report.aggregate()
+    print()
+    print(
+        f"{total['completed']}/{total['displays']} displays completed, "
+        f"{total['failed']} failed, {total['workers']} workers, {total['wall_s']:.1f}s"
+    )
+    print(
+        f"Throughput: {total['chars_per_second']:.1f} chars/s, "
+        f"{total['key_events_per_second']:.1f} key events/s"
+    )
+    print(
+        f"Lateness: p50 {total['lateness_p50_ms']:.2f} ms, "
+        f"p95 {total['lateness_p95_ms']:.2f} ms, p99 {total['lateness_p99_ms']:.2f} ms, "
+        f"max {total['lateness_max_ms']:.2f} ms, start skew {total['max_start_skew_ms']:.1f} ms"
+    )
+    for result in report.failures:
+        print(f"{result.display}: {result.error}", file=sys.stderr)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run a fan-out session and return the exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        displays = parse_displays(args.displays)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if not displays:
+        print("No displays given", file=sys.stderr)
+        return 2
+
+    texts = []
+    for path in args.files:
+        with open(path, encoding="utf-8", newline="") as handle:
+            texts.append(unix_newlines(handle.read()))
+
+    jobs = []
+    for index, display in enumerate(displays):
+        seed = None if args.seed is None else args.seed + index
+        settings = PlanSettings(
+            args.wpm, args.typo_rate / 100, args.variability / 100, args.burst, seed
+        )
+        jobs.append(FanoutJob(display, texts[index % len(texts)], settings, args.backend))
+
+    # Ctrl+C reaches every worker, which stops typing and reports what it
+    # did; displays still waiting for a worker are not started.
+    interrupted = threading.Event()
+    interrupt_handler = signal.signal(signal.SIGINT, lambda *_: interrupted.set())
+    try:
+        report = run_fanout(jobs, args.workers, args.start_delay, interrupted)
+    finally:
+        signal.signal(signal.SIGINT, interrupt_handler)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report.to_dict(), handle, indent=2)
+    if interrupted.is_set():
+        return 130
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,31 @@ License: MIT
 
 from __future__ import annotations
 
+import os
 import random
 import threading
-import time
 import tkinter as tk
+from collections import deque
 from dataclasses import dataclass
 from tkinter import messagebox, ttk
 from typing import Any, Callable, Optional
 
-import pyautogui  # type: ignore[import-untyped]
+from checkpoint import (
+    Checkpoint,
+    CheckpointWriter,
+    format_checkpoint_stats,
+    load_checkpoint,
+    resume_plan,
+)
+from engine import (
+    MAX_SEED,
+    KeystrokePlan,
+    PlanSettings,
+    TypingEngine,
+    format_duration,
+    format_phases,
+)
+from plancache import PlanCache, format_plan_cache_stats
 
 
 # Configuration & Theming
@@ -45,204 +61,6 @@ class Theme:
 THEME = Theme()
 
 
-# Typing Engine
-
-
-class TypingEngine:
-    """
-    Advanced human-like typing simulation engine.
-
-    Handles realistic human typing simulation including variable timing,
-    realistic typos based on keyboard layout, automatic corrections,
-    fatigue simulation, and burst typing patterns.
-    """
-
-    TYPO_NEIGHBORS: dict[str, str] = {
-        "a": "sqwz",
-        "b": "vghn",
-        "c": "xdfv",
-        "d": "serfcx",
-        "e": "wsdr",
-        "f": "drtgvc",
-        "g": "ftyhbv",
-        "h": "gyujnb",
-        "i": "ujko",
-        "j": "huiknm",
-        "k": "jiolm",
-        "l": "kop",
-        "m": "njk",
-        "n": "bhjm",
-        "o": "iklp",
-        "p": "ol",
-        "q": "wa",
-        "r": "edft",
-        "s": "awedxz",
-        "t": "rfgy",
-        "u": "yhji",
-        "v": "cfgb",
-        "w": "qase",
-        "x": "zsdc",
-        "y": "tghu",
-        "z": "asx",
-    }
-
-    def __init__(self) -> None:
-        """Initialize the typing engine with default state."""
-        self.is_running: bool = False
-        self.is_paused: bool = False
-        self._stop_event: threading.Event = threading.Event()
-        self._pause_event: threading.Event = threading.Event()
-        self._pause_event.set()
-        self.progress_callback: Optional[Callable[[float], None]] = None
-        self.status_callback: Optional[Callable[[str], None]] = None
-        self.stats: dict[str, int] = {
-            "chars_typed": 0,
-            "typos_made": 0,
-            "words_completed": 0,
-        }
-
-    def reset_stats(self) -> None:
-        """Reset all typing statistics to zero."""
-        self.stats = {"chars_typed": 0, "typos_made": 0, "words_completed": 0}
-
-    def stop(self) -> None:
-        """Stop typing immediately."""
-        self._stop_event.set()
-        self._pause_event.set()
-        self.is_running = False
-
-    def pause(self) -> None:
-        """Pause typing at the current position."""
-        self.is_paused = True
-        self._pause_event.clear()
-
-    def resume(self) -> None:
-        """Resume typing from the paused position."""
-        self.is_paused = False
-        self._pause_event.set()
-
-    def _get_typo_char(self, char: str) -> str:
-        """Get a realistic typo character based on keyboard layout."""
-        char_lower = char.lower()
-        if char_lower in self.TYPO_NEIGHBORS:
-            typo = random.choice(self.TYPO_NEIGHBORS[char_lower])
-            return typo.upper() if char.isupper() else typo
-        return random.choice("abcdefghijklmnopqrstuvwxyz")
-
-    def _calculate_char_delay(
-        self, char: str, base_delay: float, variability: float
-    ) -> float:
-        """Calculate delay for a character with human-like variability."""
-        delay = base_delay
-
-        if char.isupper():
-            delay *= 1.1
-
-        if char in "!@#$%^&*()_+-=[]{}|;:'\",.<>?/\\":
-            delay *= 1.3
-
-        delay *= 1 + random.uniform(-variability, variability)
-
-        if random.random() < 0.02:
-            delay += random.uniform(0.1, 0.3)
-
-        return delay
-
-    def type_text(
-        self,
-        text: str,
-        wpm: int = 60,
-        typo_rate: float = 0.05,
-        variability: float = 0.3,
-        burst_mode: bool = False,
-    ) -> None:
-        """Type text with human-like characteristics."""
-        self._stop_event.clear()
-        self.is_running = True
-        self.reset_stats()
-
-        chars_per_minute = wpm * 5
-        base_delay = 60.0 / chars_per_minute
-
-        paragraphs = text.split("\n")
-        total_chars = len(text)
-        chars_processed = 0
-
-        if self.status_callback:
-            self.status_callback("Typing started...")
-
-        for para_idx, paragraph in enumerate(paragraphs):
-            if self._stop_event.is_set():
-                break
-
-            words = paragraph.split()
-
-            for word_idx, word in enumerate(words):
-                if self._stop_event.is_set():
-                    break
-
-                self._pause_event.wait()
-
-                fatigue_factor = 1 + (chars_processed / total_chars) * 0.15
-                burst_active = burst_mode and random.random() < 0.15
-                burst_multiplier = 0.6 if burst_active else 1.0
-
-                for char in word:
-                    if self._stop_event.is_set():
-                        break
-
-                    self._pause_event.wait()
-
-                    if random.random() < typo_rate:
-                        typo_char = self._get_typo_char(char)
-                        pyautogui.write(typo_char, interval=0)
-                        self.stats["typos_made"] += 1
-                        time.sleep(random.uniform(0.15, 0.35))
-                        pyautogui.press("backspace")
-                        time.sleep(random.uniform(0.05, 0.12))
-
-                    pyautogui.write(char, interval=0)
-                    self.stats["chars_typed"] += 1
-                    chars_processed += 1
-
-                    delay = self._calculate_char_delay(
-                        char, base_delay, variability)
-                    delay *= burst_multiplier * fatigue_factor
-                    time.sleep(delay)
-
-                    if self.progress_callback:
-                        progress = (chars_processed / total_chars) * 100
-                        self.progress_callback(progress)
-
-                if word_idx < len(words) - 1:
-                    if not self._stop_event.is_set():
-                        pyautogui.press("space")
-                        chars_processed += 1
-                        self.stats["words_completed"] += 1
-                        word_pause = base_delay * \
-                            random.uniform(1.5, 2.5) * fatigue_factor
-                        time.sleep(word_pause)
-
-            if para_idx < len(paragraphs) - 1:
-                if not self._stop_event.is_set():
-                    pyautogui.press("enter")
-                    chars_processed += 1
-                    paragraph_pause = random.uniform(0.8, 1.8)
-                    time.sleep(paragraph_pause)
-
-                    if self.status_callback:
-                        self.status_callback("Typing... (new paragraph)")
-
-        self.is_running = False
-        self.stats["words_completed"] += 1
-
-        if self.status_callback:
-            if self._stop_event.is_set():
-                self.status_callback("Typing stopped")
-            else:
-                self.status_callback("Typing complete!")
-
-
 # Custom Widgets
 
 
@@ -294,16 +112,16 @@ class ModernButton(tk.Canvas):
         }
 
         self.current_color = self.colors[variant]["bg"]
+        self._drawn_state: Optional[tuple[str, str, str]] = None
+        self._create_items()
         self.redraw()
 
         self.bind("<Enter>", self._on_enter)
         self.bind("<Leave>", self._on_leave)
         self.bind("<Button-1>", self._on_click)
 
-    def redraw(self) -> None:
-        """Redraw the button with current state."""
-        self.delete("all")
-
+    def _create_items(self) -> None:
+        """Create the canvas items once; later state changes only restyle them."""
         radius = 8
         x1, y1, x2, y2 = 2, 2, self._width - 2, self._height - 2
 
@@ -334,18 +152,26 @@ class ModernButton(tk.Canvas):
             y1,
         ]
 
-        fill_color = self.current_color if self._enabled else THEME.bg_tertiary
-        text_color = self.colors[self.variant]["text"] if self._enabled else THEME.text_muted
-
-        self.create_polygon(points, fill=fill_color, smooth=True)
-        self.create_text(
+        self._shape_item = self.create_polygon(points, smooth=True)
+        self._text_item = self.create_text(
             self._width // 2,
             self._height // 2,
-            text=self.text,
-            fill=text_color,
             font=(THEME.font_family, 11, "bold"),
         )
 
+    def redraw(self) -> None:
+        """Restyle the button for its current state, skipping no-op updates."""
+        fill_color = self.current_color if self._enabled else THEME.bg_tertiary
+        text_color = self.colors[self.variant]["text"] if self._enabled else THEME.text_muted
+
+        state = (fill_color, text_color, self.text)
+        if state == self._drawn_state:
+            return
+        self._drawn_state = state
+
+        self.itemconfig(self._shape_item, fill=fill_color)
+        self.itemconfig(self._text_item, text=self.text, fill=text_color)
+
     def _on_enter(self, _: Any) -> None:
         """Handle mouse enter event."""
         if self._enabled:
@@ -466,12 +292,12 @@ class ProgressRing(tk.Canvas):
         self.ring_size = ring_size
         self.thickness = thickness
         self.progress: float = 0
+        self._drawn_percent: Optional[int] = None
+        self._create_items()
         self._draw()
 
-    def _draw(self) -> None:
-        """Redraw the progress ring."""
-        self.delete("all")
-
+    def _create_items(self) -> None:
+        """Create the track, progress arc and label once."""
         padding = 4
         x1, y1 = padding, padding
         x2, y2 = self.ring_size - padding, self.ring_size - padding
@@ -488,40 +314,100 @@ class ProgressRing(tk.Canvas):
             style="arc",
         )
 
-        if self.progress > 0:
-            extent = -360 * (self.progress / 100)
-            self.create_arc(
-                x1,
-                y1,
-                x2,
-                y2,
-                start=90,
-                extent=extent,
-                outline=THEME.accent_primary,
-                width=self.thickness,
-                style="arc",
-            )
+        self._arc_item = self.create_arc(
+            x1,
+            y1,
+            x2,
+            y2,
+            start=90,
+            extent=0,
+            outline=THEME.accent_primary,
+            width=self.thickness,
+            style="arc",
+            state="hidden",
+        )
 
-        self.create_text(
+        self._text_item = self.create_text(
             self.ring_size // 2,
             self.ring_size // 2,
-            text=f"{int(self.progress)}%",
             fill=THEME.text_primary,
             font=(THEME.font_family, 14, "bold"),
         )
 
+    def _draw(self) -> None:
+        """Update the arc and label in place when the displayed percent changes."""
+        percent = int(self.progress)
+        if percent == self._drawn_percent:
+            return
+        self._drawn_percent = percent
+
+        if self.progress > 0:
+            extent = -360 * (self.progress / 100)
+            self.itemconfig(self._arc_item, extent=extent, state="normal")
+        else:
+            self.itemconfig(self._arc_item, state="hidden")
+
+        self.itemconfig(self._text_item, text=f"{percent}%")
+
     def set_progress(self, value: float) -> None:
-        """Set the progress value and redraw."""
+        """Set the progress value and redraw if the displayed percent changed."""
         self.progress = min(100, max(0, value))
         self._draw()
 
 
+# UI Update Channel
+
+
+class UIUpdateChannel:
+    """
+    Hands engine updates to the Tk thread without calling into Tk.
+
+    The typing thread publishes progress and status messages; the UI drains
+    them on its own ``root.after`` tick. Progress lives in a one-slot deque,
+    so intermediate values are coalesced and only the latest is drawn, and
+    neither side ever takes a lock or blocks on the other.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty progress and status slots."""
+        self._progress: deque[float] = deque(maxlen=1)
+        self._statuses: deque[str] = deque()
+
+    def publish_progress(self, value: float) -> None:
+        """Record the latest progress value, replacing any undrained one."""
+        self._progress.append(value)
+
+    def publish_status(self, message: str) -> None:
+        """Queue a status message for the UI."""
+        self._statuses.append(message)
+
+    def drain_progress(self) -> Optional[float]:
+        """Take the latest progress value, if one was published."""
+        try:
+            return self._progress.popleft()
+        except IndexError:
+            return None
+
+    def drain_statuses(self) -> list[str]:
+        """Take all queued status messages in publication order."""
+        messages: list[str] = []
+        while True:
+            try:
+                messages.append(self._statuses.popleft())
+            except IndexError:
+                return messages
+
+
 # Main Application
 
 
 class PhantomKeysApp:
     """Main application window for Phantom Keys typing simulator."""
 
+    UI_REFRESH_MS = 33
+    CHECKPOINT_PATH = os.path.join(os.path.expanduser("~"), ".phantom_keys", "checkpoint.json")
+    PLAN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".phantom_keys", "plans")
+
     def __init__(self) -> None:
         """Initialize the application window and all UI components."""
         self.root = tk.Tk()
@@ -538,14 +424,25 @@ class PhantomKeysApp:
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
 
         self.engine = TypingEngine()
-        self.engine.progress_callback = self._update_progress
-        self.engine.status_callback = self._update_status
+        self.updates = UIUpdateChannel()
+        self.engine.progress_callback = self.updates.publish_progress
+        self.engine.status_callback = self.updates.publish_status
+        self.checkpoints = CheckpointWriter(self.engine, self.CHECKPOINT_PATH)
+        try:
+            self.plan_cache = PlanCache(spill_dir=self.PLAN_CACHE_DIR)
+        except OSError:
+            self.plan_cache = PlanCache()
+        self.engine.plan_cache = self.plan_cache
 
         self.typing_thread: Optional[threading.Thread] = None
+        self.pending_plan: Optional[KeystrokePlan] = None
+        self.pending_checkpoint: Optional[Checkpoint] = None
+        self._shown_phases: dict[str, float] = {}
         self.countdown_active = False
 
         self._build_ui()
         self._setup_styles()
+        self.root.after(self.UI_REFRESH_MS, self._drain_updates)
 
     def _setup_styles(self) -> None:
         """Configure ttk widget styles."""
@@ -565,6 +462,13 @@ class PhantomKeysApp:
         style.map("Modern.TCheckbutton", background=[
                   ("active", THEME.bg_secondary)])
 
+        style.configure(
+            "Modern.TSpinbox",
+            fieldbackground=THEME.bg_tertiary,
+            foreground=THEME.text_primary,
+            arrowcolor=THEME.text_secondary,
+        )
+
     def _build_ui(self) -> None:
         """Build the complete user interface."""
         # Header
@@ -708,6 +612,43 @@ class PhantomKeysApp:
         )
         burst_check.pack(side=tk.LEFT)
 
+        tk.Label(
+            options_row,
+            text="Seed",
+            font=(THEME.font_family, 10),
+            fg=THEME.text_secondary,
+            bg=THEME.bg_secondary,
+        ).pack(side=tk.LEFT, padx=(16, 8))
+        # Empty for fresh timing every session; a seed repeats it exactly.
+        self.seed_var = tk.StringVar(value="")
+        ttk.Spinbox(
+            options_row,
+            from_=0,
+            to=MAX_SEED,
+            increment=1,
+            width=8,
+            textvariable=self.seed_var,
+            style="Modern.TSpinbox",
+        ).pack(side=tk.LEFT)
+
+        self.checkpoint_interval_var = tk.StringVar(value=f"{self.checkpoints.interval:g}")
+        ttk.Spinbox(
+            options_row,
+            from_=0.5,
+            to=60,
+            increment=0.5,
+            width=5,
+            textvariable=self.checkpoint_interval_var,
+            style="Modern.TSpinbox",
+        ).pack(side=tk.RIGHT)
+        tk.Label(
+            options_row,
+            text="Save progress every (s)",
+            font=(THEME.font_family, 10),
+            fg=THEME.text_secondary,
+            bg=THEME.bg_secondary,
+        ).pack(side=tk.RIGHT, padx=(0, 8))
+
         # Progress & Status Section
         progress_section = tk.Frame(card, bg=THEME.bg_tertiary)
         progress_section.pack(fill=tk.X, padx=20, pady=(0, 20))
@@ -763,7 +704,7 @@ class PhantomKeysApp:
             text="Start",
             command=self._start_typing,
             variant="success",
-            width=130,
+            width=110,
         )
         self.start_button.pack(side=tk.LEFT, padx=(0, 10))
 
@@ -772,7 +713,7 @@ class PhantomKeysApp:
             text="Pause",
             command=self._toggle_pause,
             variant="primary",
-            width=130,
+            width=110,
         )
         self.pause_button.pack(side=tk.LEFT, padx=(0, 10))
         self.pause_button.set_enabled(False)
@@ -782,11 +723,29 @@ class PhantomKeysApp:
             text="Stop",
             command=self._stop_typing,
             variant="danger",
-            width=130,
+            width=110,
         )
-        self.stop_button.pack(side=tk.LEFT)
+        self.stop_button.pack(side=tk.LEFT, padx=(0, 10))
         self.stop_button.set_enabled(False)
 
+        self.dry_run_button = ModernButton(
+            buttons_frame,
+            text="Dry Run",
+            command=self._dry_run,
+            variant="ghost",
+            width=110,
+        )
+        self.dry_run_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.resume_button = ModernButton(
+            buttons_frame,
+            text="Resume",
+            command=self._resume_typing,
+            variant="ghost",
+            width=110,
+        )
+        self.resume_button.pack(side=tk.LEFT)
+
         # Footer
         footer = tk.Frame(self.root, bg=THEME.bg_primary)
         footer.pack(fill=tk.X, padx=30, pady=(0, 20))
@@ -814,28 +773,69 @@ class PhantomKeysApp:
 
     def _update_char_count(self, _: Any = None) -> None:
         """Update the character and word count display."""
-        text = self.text_entry.get("1.0", tk.END).strip()
-        if text != "Enter the text you want to type here...":
+        # "end-1c" leaves out the newline Tk keeps after the last line.
+        text = self.text_entry.get("1.0", "end-1c")
+        if text.strip() != "Enter the text you want to type here...":
             count = len(text)
             words = len(text.split())
             self.char_count_label.config(text=f"{count} chars, {words} words")
         else:
             self.char_count_label.config(text="0 characters")
 
+    def _drain_updates(self) -> None:
+        """Apply engine updates published since the last tick."""
+        progress = self.updates.drain_progress()
+        if progress is not None:
+            self._update_progress(progress)
+        for message in self.updates.drain_statuses():
+            self._update_status(message)
+        if self.engine.is_running and self.engine.phases is not self._shown_phases:
+            self._update_phases()
+        if self.typing_thread is not None and not self.typing_thread.is_alive():
+            # The final checkpoint is written now, so it can be resumed.
+            self.typing_thread = None
+            if not self.countdown_active:
+                self.resume_button.set_enabled(True)
+        self.root.after(self.UI_REFRESH_MS, self._drain_updates)
+
     def _update_progress(self, value: float) -> None:
         """Update the progress ring display."""
         self.progress_ring.set_progress(value)
 
+    def _update_phases(self) -> None:
+        """Show where the running session's time goes."""
+        self._shown_phases = phases = self.engine.phases
+        stats = self.engine.stats
+        self.stats_label.config(
+            text=f"Typed {stats['chars_typed']} chars, {stats['typos_made']} typos\n"
+            f"Time: {format_phases(phases)}"
+        )
+
     def _update_status(self, message: str) -> None:
         """Update the status message and handle completion state."""
         self.status_label.config(text=message)
 
         if "complete" in message.lower():
             stats = self.engine.stats
+            timing = self.engine.timing
+            dropped = stats["chars_dropped"]
+            cache = self.plan_cache.stats()
+            cache_line = (
+                f"\nPlan cache: {format_plan_cache_stats(cache)}"
+                if cache["hits"] + cache["disk_hits"] + cache["misses"]
+                else ""
+            )
             self.stats_label.config(
                 text=f"Typed {stats['chars_typed']} chars, "
                 f"{stats['words_completed']} words, "
                 f"{stats['typos_made']} typos made"
+                f"{f', {dropped} chars could not be typed' if dropped else ''}\n"
+                f"{timing.get('effective_wpm', 0):.0f} WPM achieved "
+                f"({timing.get('planned_wpm', 0):.0f} planned), "
+                f"drift {timing.get('drift_ms', 0):.1f} ms\n"
+                f"Time: {format_phases(self.engine.phases)}\n"
+                f"Checkpoints: {format_checkpoint_stats(self.checkpoints.stats())}"
+                f"{cache_line}"
             )
             self._reset_controls()
 
@@ -846,44 +846,173 @@ class PhantomKeysApp:
             self.status_label.config(text="Switch to target window!")
             self.root.after(1000, lambda: self._countdown(seconds - 1))
         elif self.countdown_active:
+            self.countdown_active = False
             self.countdown_label.config(text="")
             self._execute_typing()
 
     def _start_typing(self) -> None:
         """Start the typing process."""
-        text = self.text_entry.get("1.0", tk.END).strip()
+        text = self.text_entry.get("1.0", "end-1c")
 
-        if not text or text == "Enter the text you want to type here...":
+        if not text.strip() or text.strip() == "Enter the text you want to type here...":
             messagebox.showwarning(
                 "No Text", "Please enter some text to type.")
             return
 
+        try:
+            seed = self._seed()
+        except ValueError:
+            messagebox.showwarning(
+                "Invalid Seed",
+                f"The seed must be a whole number from 0 to {MAX_SEED}, or empty.",
+            )
+            return
+
+        settings = PlanSettings(
+            int(self.wpm_slider.get()),
+            self.typo_slider.get() / 100,
+            self.variability_slider.get() / 100,
+            self.burst_mode_var.get(),
+            seed,
+        )
+        # Saved so a resumed session can regenerate exactly this plan.
+        random_state = random.getstate()
+        try:
+            self.pending_plan = self.engine.build_plan(text, *settings)
+        except ImportError:
+            messagebox.showerror(
+                "NumPy Needed",
+                "Typing with a seed needs NumPy (pip install numpy). "
+                "Clear the seed to type without it.",
+            )
+            return
+        if seed is not None:
+            # Kept for later runs of the app as well.
+            self.plan_cache.save()
+        self.pending_checkpoint = Checkpoint.begin(text, settings, random_state)
+        calibration = self.engine.calibrate()
+        self.stats_label.config(
+            text=f"Estimated time {format_duration(self.pending_plan.duration)}, "
+            f"{len(self.pending_plan)} keystrokes\n"
+            f"Key overhead {calibration.call_overhead * 1000:.1f} ms "
+            f"(implicit pause of {calibration.implicit_pause * 1000:.0f} ms disabled)"
+        )
+        self.progress_ring.set_progress(0)
+        self._begin_countdown()
+
+    def _seed(self) -> Optional[int]:
+        """The seed in the settings, or None when the field is empty."""
+        text = self.seed_var.get().strip()
+        if not text:
+            return None
+        seed = int(text)
+        if not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"seed out of range: {seed}")
+        return seed
+
+    def _resume_typing(self) -> None:
+        """Continue an interrupted session from its last checkpoint."""
+        text = self.text_entry.get("1.0", "end-1c")
+
+        try:
+            checkpoint = load_checkpoint(self.CHECKPOINT_PATH)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Cannot Resume", str(error))
+            return
+        if checkpoint is None:
+            messagebox.showinfo("Nothing to Resume", "There is no interrupted session to resume.")
+            return
+
+        try:
+            self.pending_plan = resume_plan(self.engine, checkpoint, text)
+        except ValueError:
+            messagebox.showwarning(
+                "Text Changed",
+                "The text differs from the interrupted session, so it cannot be resumed.",
+            )
+            return
+        self.pending_checkpoint = checkpoint
+        self.engine.calibrate()
+        settings = checkpoint.settings
+        self.stats_label.config(
+            text=f"Resuming at {checkpoint.percent:.0f}% with {settings.wpm} WPM, "
+            f"{settings.typo_rate:.0%} typos\n"
+            f"Estimated time left {format_duration(self.pending_plan.duration)}, "
+            f"{len(self.pending_plan)} keystrokes"
+        )
+        self.progress_ring.set_progress(checkpoint.percent)
+        self._begin_countdown()
+
+    def _begin_countdown(self) -> None:
+        """Lock the controls and count down to the pending plan."""
         self.start_button.set_enabled(False)
         self.pause_button.set_enabled(True)
         self.stop_button.set_enabled(True)
-        self.progress_ring.set_progress(0)
+        self.dry_run_button.set_enabled(False)
+        self.resume_button.set_enabled(False)
 
         self.countdown_active = True
         delay = int(self.delay_slider.get())
         self._countdown(delay)
 
+    def _dry_run(self) -> None:
+        """Simulate the current text and settings and show the projection."""
+        text = self.text_entry.get("1.0", "end-1c")
+
+        if not text.strip() or text.strip() == "Enter the text you want to type here...":
+            messagebox.showwarning(
+                "No Text", "Please enter some text to simulate.")
+            return
+
+        report = self.engine.dry_run(
+            text,
+            int(self.wpm_slider.get()),
+            self.typo_slider.get() / 100,
+            self.variability_slider.get() / 100,
+            self.burst_mode_var.get(),
+        )
+        start_pace = report.timeline[0].wpm if report.timeline else 0.0
+        end_pace = report.timeline[-1].wpm if report.timeline else 0.0
+        self.status_label.config(text="Dry run complete")
+        self.stats_label.config(
+            text=f"Projected {format_duration(report.duration)}, "
+            f"{report.keystrokes} keystrokes, {report.typos} typos\n"
+            f"Pace {start_pace:.0f} WPM at the start, {end_pace:.0f} WPM at the end"
+        )
+
     def _execute_typing(self) -> None:
-        """Execute typing in a separate thread."""
-        text = self.text_entry.get("1.0", tk.END).strip()
+        """Play the precompiled plan in a separate thread."""
+        if self.pending_plan is None or self.pending_checkpoint is None:
+            return
+        try:
+            interval = float(self.checkpoint_interval_var.get())
+        except ValueError:
+            interval = self.checkpoints.interval
+        self.checkpoints.interval = max(interval, 0.5)
+        self.checkpoint_interval_var.set(f"{self.checkpoints.interval:g}")
 
         self.typing_thread = threading.Thread(
-            target=self.engine.type_text,
-            args=(
-                text,
-                int(self.wpm_slider.get()),
-                self.typo_slider.get() / 100,
-                self.variability_slider.get() / 100,
-                self.burst_mode_var.get(),
-            ),
+            target=self._play_session,
+            args=(self.pending_plan, self.pending_checkpoint),
             daemon=True,
         )
         self.typing_thread.start()
 
+    def _play_session(self, plan: KeystrokePlan, checkpoint: Checkpoint) -> None:
+        """Play a plan on the typing thread while checkpointing its progress."""
+        completed = False
+        self.checkpoints.start(checkpoint)
+        try:
+            self.engine.play_plan(plan)
+            completed = not self.engine.stopped
+        finally:
+            # Gives the clipboard used for pasting its old content back; the
+            # backend stays usable for the next session.
+            try:
+                self.engine.backend.close()
+            finally:
+                self.checkpoints.finish(completed)
+
     def _toggle_pause(self) -> None:
         """Toggle between paused and running states."""
         if self.engine.is_paused:
@@ -911,6 +1040,10 @@ class PhantomKeysApp:
         self.start_button.set_enabled(True)
         self.pause_button.set_enabled(False)
         self.stop_button.set_enabled(False)
+        self.dry_run_button.set_enabled(True)
+        # Until the typing thread has saved the final checkpoint, the one on
+        # disk may be stale; _drain_updates enables Resume once it is done.
+        self.resume_button.set_enabled(self.typing_thread is None)
         self.pause_button.text = "Pause"
         self.pause_button.redraw()
 
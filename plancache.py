@@ -0,0 +1,142 @@
+"""
+Phantom Keys - Plan Cache
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from engine import KeystrokePlan, PlanSettings
+from planfile import PlanFile, write_plan
+
+
+# SHA-256 of the text and the settings the plan was generated with.
+PlanKey = Tuple[bytes, PlanSettings]
+
+
+class PlanCache:
+    """
+    Least recently used cache of compiled keystroke plans.
+
+    Attach one to ``TypingEngine.plan_cache`` and ``build_plan`` returns
+    the cached plan for text it has already planned with the same settings
+    and seed. Unseeded plans are never cached, since each one is meant to
+    be different. The cache holds at most ``max_bytes`` of plan data. When a
+    ``spill_dir`` is given, evicted plans are written there as plan files
+    and read back on a later miss instead of being planned again.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, spill_dir: Optional[str] = None) -> None:
+        """Create an empty cache bounded to ``max_bytes``."""
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._plans: OrderedDict[PlanKey, KeystrokePlan] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.spills = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        """Number of plans held in memory."""
+        return len(self._plans)
+
+    def _spill_path(self, key: PlanKey) -> str:
+        """File a plan is spilled to, named after its key."""
+        text_hash, settings = key
+        name = hashlib.sha256(text_hash + repr(tuple(settings)).encode()).hexdigest()
+        return os.path.join(self.spill_dir or "", f"{name[:32]}.pkplan")
+
+    def get(self, key: PlanKey) -> Optional[KeystrokePlan]:
+        """Return the cached plan for a key, or None on a miss."""
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+        plan = self._load_spilled(key)
+        if plan is not None:
+            self.disk_hits += 1
+            self.put(key, plan)
+            return plan
+
+        self.misses += 1
+        return None
+
+    def _load_spilled(self, key: PlanKey) -> Optional[KeystrokePlan]:
+        """Read a spilled plan back from disk, if there is a valid one."""
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with PlanFile(path) as plan_file:
+                if (plan_file.text_hash, plan_file.settings) != key:
+                    return None
+                return plan_file.copy_plan()
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: PlanKey, plan: KeystrokePlan) -> None:
+        """Cache a plan, evicting the least recently used ones to make room."""
+        if key in self._plans:
+            self.size_bytes -= self._plans.pop(key).nbytes
+        self._plans[key] = plan
+        self.size_bytes += plan.nbytes
+        while self.size_bytes > self.max_bytes and self._plans:
+            evicted_key, evicted = self._plans.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+            self.evictions += 1
+            self._spill(evicted_key, evicted)
+
+    def _spill(self, key: PlanKey, plan: KeystrokePlan) -> None:
+        """Write an evicted plan to the spill directory."""
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            write_plan(path, plan, key[1], key[0])
+        except OSError:
+            return
+        self.spills += 1
+
+    def save(self) -> None:
+        """Write the plans held in memory to the spill directory, for later processes."""
+        for key, plan in self._plans.items():
+            self._spill(key, plan)
+
+    def clear(self) -> None:
+        """Drop every plan held in memory; spilled plans stay on disk."""
+        self._plans.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Counters describing how well the cache is doing."""
+        return {
+            "entries": len(self._plans),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "spills": self.spills,
+        }
+
+
+def format_plan_cache_stats(stats: dict[str, int]) -> str:
+    """Describe how a session used the plan cache in one line."""
+    return (
+        f"{stats['hits']} plans reused from memory, {stats['disk_hits']} from disk, "
+        f"{stats['misses']} planned, {stats['spills']} saved to disk"
+    )
@@ -0,0 +1,218 @@
+"""
+Phantom Keys - Plan Files
+
+Saves keystroke plans to a compact binary file and maps them back into
+memory for replay without regenerating or parsing anything.
+
+File layout (little-endian), version 1:
+
+    header   96 bytes, see ``HEADER``
+    times    float64 per keystroke, seconds from the plan start
+    keys     uint32 per keystroke, character or key code
+    offsets  uint32 per keystroke, offset in the source text
+    actions  uint8 per keystroke, a ``KeyAction`` value
+
+Each section is a run of fixed-width records, so every column of a loaded
+plan is a zero-copy view into the mapped file.
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Optional
+
+from engine import KeystrokePlan, PlanColumn, PlanSettings, text_digest
+
+
+MAGIC = b"PKPLAN\r\n"
+VERSION = 1
+
+# magic, version, header size, flags, keystrokes, total chars, wpm,
+# burst mode, has seed, typo rate, variability, seed, text SHA-256
+HEADER = struct.Struct("<8sHHIQQIBB2xddq32s")
+
+# (array typecode, item size) of each column, in file order.
+COLUMNS = (("d", 8), ("I", 4), ("I", 4), ("B", 1))
+
+
+def _write_column(handle: BinaryIO, typecode: str, values: PlanColumn) -> None:
+    """Write one column in little-endian byte order."""
+    if sys.byteorder == "little":
+        handle.write(values)
+        return
+    column = array(typecode, values)
+    column.byteswap()
+    handle.write(column)
+
+
+def save_plan(path: str, plan: KeystrokePlan, text: str, settings: PlanSettings) -> None:
+    """Save a plan with the settings that produced it and a hash of its text."""
+    write_plan(path, plan, settings, text_digest(text))
+
+
+def write_plan(
+    path: str, plan: KeystrokePlan, settings: PlanSettings, text_hash: bytes
+) -> None:
+    """Save a plan given the SHA-256 of its text, as returned by ``text_digest``."""
+    times, keys, actions, offsets = plan.columns()
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        HEADER.size,
+        0,
+        len(plan),
+        plan.total_chars,
+        settings.wpm,
+        settings.burst_mode,
+        settings.seed is not None,
+        settings.typo_rate,
+        settings.variability,
+        settings.seed or 0,
+        text_hash,
+    )
+    with open(path, "wb") as handle:
+        handle.write(header)
+        _write_column(handle, "d", times)
+        _write_column(handle, "I", keys)
+        _write_column(handle, "I", offsets)
+        _write_column(handle, "B", actions)
+
+
+class PlanFile:
+    """
+    A saved keystroke plan, memory-mapped for immediate replay.
+
+    Nothing is read beyond the header until playback touches it. Call
+    ``verify`` with the source text before playing, and ``close`` once the
+    plan is no longer needed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map a plan file and validate its header."""
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a plan file") from None
+        self._views: list[memoryview] = []
+        try:
+            self.plan = self._read()
+        except Exception:
+            self.close()
+            raise
+
+    def _read(self) -> KeystrokePlan:
+        """Parse the header and expose each column as a view of the file."""
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a plan file")
+        (
+            magic,
+            version,
+            header_size,
+            _flags,
+            count,
+            total_chars,
+            wpm,
+            burst_mode,
+            has_seed,
+            typo_rate,
+            variability,
+            seed,
+            self.text_hash,
+        ) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a Phantom Keys plan file")
+        if version != VERSION:
+            raise ValueError(f"{self.path} has unsupported plan file version {version}")
+        if header_size < HEADER.size:
+            raise ValueError(f"{self.path} has a corrupt header")
+
+        expected = header_size + count * sum(size for _, size in COLUMNS)
+        if len(self._map) != expected:
+            raise ValueError(f"{self.path} is truncated or corrupt")
+
+        self.settings = PlanSettings(
+            wpm, typo_rate, variability, bool(burst_mode), seed if has_seed else None
+        )
+
+        data = memoryview(self._map)
+        self._views.append(data)
+        columns: list[PlanColumn] = []
+        position = header_size
+        for typecode, size in COLUMNS:
+            raw = data[position : position + count * size]
+            position += count * size
+            self._views.append(raw)
+            if sys.byteorder == "little":
+                column: PlanColumn = raw.cast(typecode)
+                self._views.append(column)
+            else:
+                column = array(typecode, raw.tobytes())
+                column.byteswap()
+            columns.append(column)
+
+        times, keys, offsets, actions = columns
+        return KeystrokePlan(times, keys, actions, offsets, total_chars)
+
+    def copy_plan(self) -> KeystrokePlan:
+        """Copy the plan into memory so it outlives the mapped file."""
+        columns = []
+        for column in self.plan.columns():
+            view = memoryview(column)
+            copy = array(view.format)
+            with view.cast("B") as raw:
+                copy.frombytes(raw)
+            view.release()
+            columns.append(copy)
+        times, keys, actions, offsets = columns
+        return KeystrokePlan(times, keys, actions, offsets, self.plan.total_chars)
+
+    def matches(self, text: str) -> bool:
+        """Whether the plan was generated from exactly this text."""
+        return text_digest(text) == self.text_hash
+
+    def verify(self, text: str) -> None:
+        """Raise ValueError unless the plan was generated from this text."""
+        if not self.matches(text):
+            raise ValueError(f"{self.path} was generated from a different text")
+
+    def close(self) -> None:
+        """Release the mapped file; the plan must not be used afterwards."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        try:
+            self._map.close()
+        except BufferError:
+            # Views handed out by the plan are still alive; the mapping is
+            # released once the last of them is garbage collected.
+            pass
+        self._file.close()
+
+    def __enter__(self) -> PlanFile:
+        """Use the plan file as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close the plan file."""
+        self.close()
+
+
+def load_plan(path: str, text: Optional[str] = None) -> PlanFile:
+    """Map a plan file, verifying it against ``text`` when one is given."""
+    plan_file = PlanFile(path)
+    if text is not None:
+        try:
+            plan_file.verify(text)
+        except ValueError:
+            plan_file.close()
+            raise
+    return plan_file
@@ -0,0 +1,37 @@
+"""
+Phantom Keys - Session Profiling
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def capture_profile(path: str, memory: bool = False) -> Iterator[None]:
+    """
+    Profile the code run inside the block and save the results.
+
+    CPU statistics for the calling thread are written to ``path`` in pstats
+    format (``python -m pstats path``). With ``memory`` enabled, a
+    tracemalloc snapshot is also saved to ``path + ".tracemalloc"`` and can
+    be read back with ``tracemalloc.Snapshot.load``.
+    """
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start(10)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        if memory:
+            tracemalloc.take_snapshot().dump(path + ".tracemalloc")
+            tracemalloc.stop()
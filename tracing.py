@@ -0,0 +1,223 @@
+"""
+Phantom Keys - Keystroke Trace
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from array import array
+from typing import Iterator, NamedTuple
+
+from engine import KeyAction
+
+
+ACTION_NAMES: dict[int, str] = {
+    KeyAction.CHAR: "char",
+    KeyAction.TYPO: "typo",
+    KeyAction.BACKSPACE: "backspace",
+    KeyAction.SPACE: "space",
+    KeyAction.ENTER: "enter",
+    KeyAction.DELETE: "delete",
+    KeyAction.LEFT: "left",
+    KeyAction.RIGHT: "right",
+    KeyAction.DOC_START: "doc_start",
+    KeyAction.DOC_END: "doc_end",
+    KeyAction.PARAGRAPH_UP: "paragraph_up",
+    KeyAction.PARAGRAPH_DOWN: "paragraph_down",
+    KeyAction.WORD_LEFT: "word_left",
+}
+
+
+TRACE_COLUMNS = (
+    "offset",
+    "action",
+    "planned_s",
+    "start_s",
+    "end_s",
+    "call_ms",
+    "overshoot_ms",
+    "lateness_ms",
+)
+
+
+class TraceRecord(NamedTuple):
+    """Planned and actual timing of one injected keystroke, in seconds."""
+
+    offset: int
+    action: int
+    planned: float
+    start: float
+    end: float
+    overshoot: float
+
+    @property
+    def call_duration(self) -> float:
+        """Time spent inside the backend call."""
+        return self.end - self.start
+
+    @property
+    def lateness(self) -> float:
+        """How much later than planned the keystroke was delivered."""
+        return self.end - self.planned
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class KeystrokeTrace:
+    """
+    Fixed-size ring buffer of per-keystroke timings.
+
+    Attach one to ``TypingEngine.trace`` to record every event of each
+    session it plays; once ``capacity`` events are held the oldest are
+    overwritten.
+    Columns are preallocated typed arrays, so recording allocates nothing.
+    All times are seconds since the (pause-adjusted) session start.
+    """
+
+    def __init__(self, capacity: int = 100_000) -> None:
+        """Preallocate room for ``capacity`` events."""
+        if capacity <= 0:
+            raise ValueError("Trace capacity must be positive")
+        self.capacity = capacity
+        self._offset = array("q", bytes(8 * capacity))
+        self._action = array("B", bytes(capacity))
+        self._planned = array("d", bytes(8 * capacity))
+        self._start = array("d", bytes(8 * capacity))
+        self._end = array("d", bytes(8 * capacity))
+        self._overshoot = array("d", bytes(8 * capacity))
+        self.recorded = 0
+
+    def clear(self) -> None:
+        """Forget all recorded events."""
+        self.recorded = 0
+
+    def record(
+        self,
+        offset: int,
+        action: int,
+        planned: float,
+        start: float,
+        end: float,
+        overshoot: float,
+    ) -> None:
+        """Store one event, overwriting the oldest when the buffer is full."""
+        index = self.recorded % self.capacity
+        self._offset[index] = offset
+        self._action[index] = action
+        self._planned[index] = planned
+        self._start[index] = start
+        self._end[index] = end
+        self._overshoot[index] = overshoot
+        self.recorded += 1
+
+    def __len__(self) -> int:
+        """Number of events currently held."""
+        return min(self.recorded, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        """Number of events overwritten because the buffer was full."""
+        return self.recorded - len(self)
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        """Yield the held events from oldest to newest."""
+        first = self.recorded - len(self)
+        for position in range(first, self.recorded):
+            index = position % self.capacity
+            yield TraceRecord(
+                self._offset[index],
+                self._action[index],
+                self._planned[index],
+                self._start[index],
+                self._end[index],
+                self._overshoot[index],
+            )
+
+    def rows(self) -> Iterator[dict[str, object]]:
+        """Yield the held events as export rows with millisecond durations."""
+        for record in self:
+            yield {
+                "offset": record.offset,
+                "action": ACTION_NAMES.get(record.action, str(record.action)),
+                "planned_s": round(record.planned, 6),
+                "start_s": round(record.start, 6),
+                "end_s": round(record.end, 6),
+                "call_ms": round(record.call_duration * 1000, 4),
+                "overshoot_ms": round(record.overshoot * 1000, 4),
+                "lateness_ms": round(record.lateness * 1000, 4),
+            }
+
+    def export_jsonl(self, path: str) -> None:
+        """Write the held events to a JSON lines file."""
+        with open(path, "w", encoding="utf-8") as handle:
+            for row in self.rows():
+                handle.write(json.dumps(row) + "\n")
+
+    def export_csv(self, path: str) -> None:
+        """Write the held events to a CSV file."""
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(TRACE_COLUMNS))
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def export(self, path: str) -> None:
+        """Write the trace as CSV or JSON lines, depending on the file extension."""
+        if path.lower().endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_jsonl(path)
+
+    def wpm_over_time(self, window: float = 10.0) -> list[tuple[float, float]]:
+        """Return (window end, WPM) pairs of characters delivered per window."""
+        counts: dict[int, int] = {}
+        finished = 0.0
+        for record in self:
+            if record.action == KeyAction.CHAR:
+                bucket = int(record.end // window)
+                counts[bucket] = counts.get(bucket, 0) + 1
+                finished = max(finished, record.end)
+        if not counts:
+            return []
+
+        first, last = min(counts), max(counts)
+        points: list[tuple[float, float]] = []
+        for bucket in range(first, last + 1):
+            # The last window is usually partial, so it only counts up to
+            # the final keystroke.
+            end = min((bucket + 1) * window, finished) if bucket == last else (bucket + 1) * window
+            span = max(end - bucket * window, 1e-9)
+            points.append((end, counts.get(bucket, 0) / 5 / (span / 60)))
+        return points
+
+    def summary(self, window: float = 10.0) -> dict[str, object]:
+        """Summarize lateness, call and overshoot percentiles in milliseconds."""
+        lateness: list[float] = []
+        calls: list[float] = []
+        overshoots: list[float] = []
+        for record in self:
+            lateness.append(record.lateness * 1000)
+            calls.append(record.call_duration * 1000)
+            overshoots.append(record.overshoot * 1000)
+
+        summary: dict[str, object] = {"events": len(self), "dropped": self.dropped}
+        for name, values in (
+            ("lateness", lateness),
+            ("call", calls),
+            ("overshoot", overshoots),
+        ):
+            summary[f"{name}_p50_ms"] = percentile(values, 0.50)
+            summary[f"{name}_p95_ms"] = percentile(values, 0.95)
+            summary[f"{name}_p99_ms"] = percentile(values, 0.99)
+            summary[f"{name}_max_ms"] = max(values, default=0.0)
+        summary["wpm_over_time"] = self.wpm_over_time(window)
+        return summary
@@ -0,0 +1,433 @@
+"""
+Phantom Keys - Incremental Updates
+
+Revises a text that has already been typed by typing only what changed:
+the cursor is moved to each changed stretch, the old characters there are
+deleted and the new ones are typed with the usual timing model.
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Callable, Iterator, NamedTuple, Optional, Tuple
+
+from engine import KeyAction, KeystrokePlan
+
+if TYPE_CHECKING:
+    from engine import TypingEngine
+
+
+LINE = re.compile(r"[^\n]*\n|[^\n]+")
+WORD = re.compile(r"\w+|\s|[^\w\s]")
+# Word jumps stop at the start of every word. Platforms disagree on what
+# joins or splits words (punctuation, underscores, other scripts) and on
+# line breaks, so jumps are only planned across ASCII letters, digits and
+# spaces, to words that follow a space or start a line.
+WORD_START = re.compile(r"(?<![^ \n])[A-Za-z0-9]")
+WORD_BARRIER = re.compile(r"[^A-Za-z0-9 ]")
+
+# How texts are split at each level of detail (lines, then words, spaces
+# and punctuation, then characters), the longest changed stretch that is
+# compared at that level in one go, and which parts never start a match.
+# Spaces are far too common to anchor a match on.
+LEVELS: tuple[tuple[Callable[[str], list[str]], int, Optional[Callable[[str], bool]]], ...] = (
+    (LINE.findall, sys.maxsize, None),
+    (WORD.findall, 5_000, str.isspace),
+    (list, 2_000, None),
+)
+
+# Pauses in seconds after each kind of key, as bounds of a uniform draw.
+KEY_DELAYS: dict[int, tuple[float, float]] = {
+    KeyAction.LEFT: (0.03, 0.07),
+    KeyAction.RIGHT: (0.03, 0.07),
+    KeyAction.PARAGRAPH_UP: (0.08, 0.16),
+    KeyAction.PARAGRAPH_DOWN: (0.08, 0.16),
+    KeyAction.DOC_START: (0.2, 0.4),
+    KeyAction.DOC_END: (0.2, 0.4),
+    KeyAction.WORD_LEFT: (0.05, 0.11),
+    KeyAction.DELETE: (0.04, 0.09),
+}
+# Pause before changing a stretch, once the cursor has reached it.
+SETTLE_DELAY = (0.3, 0.7)
+
+# A run of one navigation key: (action, presses).
+Route = Tuple[Tuple[int, int], ...]
+
+
+class Edit(NamedTuple):
+    """Replace ``old[old_start:old_end]`` with ``new[new_start:new_end]``."""
+
+    old_start: int
+    old_end: int
+    new_start: int
+    new_end: int
+
+
+@dataclass(frozen=True)
+class UpdateReport:
+    """Cost of an incremental update next to typing the new text from scratch."""
+
+    edits: int
+    deleted: int
+    inserted: int
+    navigation: int
+    keystrokes: int
+    duration: float
+    full_keystrokes: int
+    full_duration: float
+
+    @property
+    def keystroke_saving(self) -> float:
+        """How many times fewer keystrokes the update needs."""
+        return self.full_keystrokes / max(self.keystrokes, 1)
+
+    @property
+    def time_saving(self) -> float:
+        """How many times faster the update is."""
+        return self.full_duration / self.duration if self.duration > 0 else float("inf")
+
+
+def _common_prefix(old: str, new: str) -> int:
+    """Length of the common prefix, found by bisection on C-level comparisons."""
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(old: str, new: str, limit: int) -> int:
+    """Length of the common suffix, at most ``limit``."""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle :] == new[len(new) - middle :]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _diff(
+    old: str, new: str, old_base: int, new_base: int, level: int, edits: list[Edit]
+) -> None:
+    """Compare two stretches at one level of detail, refining replaced parts."""
+    split, _, isjunk = LEVELS[level]
+    old_parts, new_parts = split(old), split(new)
+    old_starts = [0]
+    for part in old_parts:
+        old_starts.append(old_starts[-1] + len(part))
+    new_starts = [0]
+    for part in new_parts:
+        new_starts.append(new_starts[-1] + len(part))
+
+    matcher = SequenceMatcher(isjunk, old_parts, new_parts, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        a1, a2, b1, b2 = old_starts[i1], old_starts[i2], new_starts[j1], new_starts[j2]
+        if tag == "replace" and level + 1 < len(LEVELS):
+            if max(a2 - a1, b2 - b1) <= LEVELS[level + 1][1]:
+                _diff(old[a1:a2], new[b1:b2], old_base + a1, new_base + b1, level + 1, edits)
+                continue
+            # Too long to compare in one go: pair the parts up in order.
+            pairs = min(i2 - i1, j2 - j1)
+            for k in range(pairs):
+                _diff(
+                    old_parts[i1 + k],
+                    new_parts[j1 + k],
+                    old_base + old_starts[i1 + k],
+                    new_base + new_starts[j1 + k],
+                    level + 1,
+                    edits,
+                )
+            a1, b1 = old_starts[i1 + pairs], new_starts[j1 + pairs]
+            if a1 == a2 and b1 == b2:
+                continue
+        edits.append(Edit(old_base + a1, old_base + a2, new_base + b1, new_base + b2))
+
+
+def diff_texts(old: str, new: str) -> list[Edit]:
+    """
+    Find the stretches that differ between two texts, in text order.
+
+    The common start and end are skipped first. The rest is compared line
+    by line, changed lines word by word, and short changed stretches
+    character by character, so correcting a word only touches the letters
+    that changed.
+    """
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    edits: list[Edit] = []
+    _diff(
+        old[prefix : len(old) - suffix],
+        new[prefix : len(new) - suffix],
+        prefix,
+        prefix,
+        0,
+        edits,
+    )
+    return edits
+
+
+class _Document:
+    """
+    Where the paragraphs are while edits are applied from the start.
+
+    Everything before ``split`` already reads like the new text; the rest
+    is still the old text, moved by ``shift`` characters.
+    """
+
+    def __init__(self, old: str, new: str) -> None:
+        """Index the newlines of both texts and the words of the old one."""
+        self.old_newlines = [match.start() for match in re.finditer("\n", old)]
+        self.new_newlines = [match.start() for match in re.finditer("\n", new)]
+        self.word_starts = [match.start() for match in WORD_START.finditer(old)]
+        self.word_barriers = [match.start() for match in WORD_BARRIER.finditer(old)]
+        self.split = 0
+        self.shift = 0
+        self.length = len(old)
+
+    def newlines(self, start: int, stop: int) -> int:
+        """Number of newlines in ``document[start:stop]``."""
+        count = 0
+        if start < self.split:
+            new = self.new_newlines
+            count += bisect_left(new, min(stop, self.split)) - bisect_left(new, start)
+        if stop > self.split:
+            old, shift = self.old_newlines, self.shift
+            first = max(start, self.split) - shift
+            count += bisect_left(old, stop - shift) - bisect_left(old, first)
+        return count
+
+    def paragraph_start(self, position: int) -> int:
+        """Start of the paragraph that contains ``position``."""
+        if position > self.split:
+            old = self.old_newlines
+            index = bisect_left(old, position - self.shift) - 1
+            if index >= 0 and old[index] + self.shift >= self.split:
+                return old[index] + self.shift + 1
+        new = self.new_newlines
+        index = bisect_left(new, min(position, self.split)) - 1
+        return new[index] + 1 if index >= 0 else 0
+
+    def next_paragraph(self, position: int) -> Optional[int]:
+        """Start of the paragraph after the one containing ``position``, if any."""
+        if position < self.split:
+            new = self.new_newlines
+            index = bisect_left(new, position)
+            if index < len(new) and new[index] < self.split:
+                return new[index] + 1
+        old = self.old_newlines
+        index = bisect_left(old, max(position, self.split) - self.shift)
+        return old[index] + self.shift + 1 if index < len(old) else None
+
+    def apply(self, edit: Edit) -> None:
+        """Record that ``edit`` has been made."""
+        self.split = edit.new_end
+        self.shift = edit.new_end - edit.old_end
+        self.length += (edit.new_end - edit.new_start) - (edit.old_end - edit.old_start)
+
+    def jumps(self, start: int, stop: int) -> Route:
+        """Ctrl+Up or Ctrl+Down presses from ``start`` to the paragraph start ``stop``."""
+        if stop > start:
+            return ((KeyAction.PARAGRAPH_DOWN, self.newlines(start, stop)),)
+        # Ctrl+Up first goes to the start of the current paragraph.
+        presses = self.newlines(max(stop - 1, 0), start - 1) + (stop == 0)
+        return ((KeyAction.PARAGRAPH_UP, presses),)
+
+    def word_jumps(self, start: int, target: int) -> Optional[Route]:
+        """
+        Ctrl+Left presses from ``start`` back towards ``target``, then arrows.
+
+        Only the part that is still the old text is known word by word, so
+        both positions must lie in it. Returns None when no jump fits.
+        """
+        if target < self.split or start <= target:
+            return None
+        low, high = target - self.shift, start - self.shift
+        barriers, starts = self.word_barriers, self.word_starts
+        index = bisect_left(barriers, high) - 1
+        floor = max(barriers[index] + 1 if index >= 0 else 0, low)
+        first = bisect_left(starts, floor)
+        presses = bisect_left(starts, high) - first
+        best: Optional[Route] = None
+        if presses:
+            best = ((KeyAction.WORD_LEFT, presses),) + _arrows(low - starts[first])
+        # One more jump past the target may leave fewer arrows to press.
+        if first and (index < 0 or starts[first - 1] > barriers[index]):
+            beyond = ((KeyAction.WORD_LEFT, presses + 1),) + _arrows(low - starts[first - 1])
+            if best is None or _presses(beyond) < _presses(best):
+                best = beyond
+        return best
+
+    def approach(self, position: int, target: int) -> Route:
+        """
+        Arrows from ``position`` to ``target``, or word jumps where fewer.
+
+        From the start of the next paragraph, the jumps begin one character
+        back, at the end of the target's paragraph.
+        """
+        best = _arrows(target - position)
+        if position > target:
+            prefix: Route = ()
+            if self.newlines(position - 1, position):
+                prefix = ((KeyAction.LEFT, 1),)
+            jumps = self.word_jumps(position - len(prefix), target)
+            if jumps is not None and _presses(prefix + jumps) < _presses(best):
+                best = prefix + jumps
+        return best
+
+    def route(self, cursor: int, target: int) -> Route:
+        """
+        The fewest key presses that move the cursor from ``cursor`` to ``target``.
+
+        Candidates start from the cursor or from a jump to either end of
+        the document, then jump by paragraphs to the start of the target's
+        paragraph, or the next one, or not at all, and finish with arrows,
+        or with word jumps back from a position after the target.
+        """
+        stops = [self.paragraph_start(target), self.next_paragraph(target)]
+        origins: tuple[tuple[int, Route], ...] = (
+            (cursor, ()),
+            (0, ((KeyAction.DOC_START, 1),)),
+            (self.length, ((KeyAction.DOC_END, 1),)),
+        )
+        best: Route = _arrows(target - cursor)
+        best_presses = abs(target - cursor)
+        for origin, prefix in origins:
+            candidates = [prefix + self.approach(origin, target)]
+            for stop in stops:
+                if stop is not None and stop != origin:
+                    candidates.append(
+                        prefix + self.jumps(origin, stop) + self.approach(stop, target)
+                    )
+            for candidate in candidates:
+                presses = _presses(candidate)
+                if presses < best_presses:
+                    best, best_presses = candidate, presses
+        return best
+
+
+def _presses(route: Route) -> int:
+    """Number of key presses on a route."""
+    return sum(count for _, count in route)
+
+
+def _arrows(steps: int) -> Route:
+    """Arrow presses that move the cursor ``steps`` characters."""
+    if steps > 0:
+        return ((KeyAction.RIGHT, steps),)
+    if steps < 0:
+        return ((KeyAction.LEFT, -steps),)
+    return ()
+
+
+def _iter_update_events(
+    engine: TypingEngine,
+    old: str,
+    new: str,
+    edits: list[Edit],
+    wpm: int,
+    typo_rate: float,
+    variability: float,
+    burst_mode: bool,
+) -> Iterator[tuple[int, int, str, float]]:
+    """
+    Generate timed events that apply ``edits``, in KeyEvent field order.
+
+    Edits are applied from the start of the text, so everything before the
+    cursor already reads like the new text and every target is a position
+    in it. The cursor starts at the end of the old text, where typing left
+    it, and takes the shortest route to each edit.
+    """
+    uniform = random.uniform
+    press_keys = KeystrokePlan.PRESS_KEYS
+    base_delay = 60.0 / (wpm * 5)
+    document = _Document(old, new)
+    elapsed = 0.0
+    cursor = len(old)
+
+    for edit in edits:
+        target = edit.new_start
+        for action, presses in document.route(cursor, target):
+            key, delay = press_keys[action], KEY_DELAYS[action]
+            for _ in range(presses):
+                yield (target, action, key, elapsed)
+                elapsed += uniform(*delay)
+        elapsed += uniform(*SETTLE_DELAY)
+
+        for _ in range(edit.old_end - edit.old_start):
+            yield (target, KeyAction.DELETE, "delete", elapsed)
+            elapsed += uniform(*KEY_DELAYS[KeyAction.DELETE])
+
+        run = new[edit.new_start : edit.new_end]
+        if run:
+            event_time = elapsed
+            for offset, action, key, at in engine._iter_plan_events(
+                (run,), len(new), wpm, typo_rate, variability, burst_mode, start_offset=target
+            ):
+                event_time = elapsed + at
+                yield (offset, action, key, event_time)
+            elapsed = event_time + base_delay
+
+        cursor = edit.new_end
+        document.apply(edit)
+
+
+def build_update_plan(
+    engine: TypingEngine,
+    old_text: str,
+    new_text: str,
+    wpm: int,
+    typo_rate: float,
+    variability: float,
+    burst_mode: bool,
+) -> tuple[KeystrokePlan, UpdateReport]:
+    """
+    Plan the keystrokes that turn typed ``old_text`` into ``new_text``.
+
+    The report compares the update with a plan that types ``new_text``
+    from scratch.
+    """
+    start = time.perf_counter()
+    edits = diff_texts(old_text, new_text)
+    plan = KeystrokePlan.from_events(
+        _iter_update_events(
+            engine, old_text, new_text, edits, wpm, typo_rate, variability, burst_mode
+        ),
+        len(new_text),
+    )
+    full = engine.build_plan(new_text, wpm, typo_rate, variability, burst_mode)
+    # The comparison is part of planning the update.
+    engine._plan_seconds = time.perf_counter() - start
+
+    actions = bytes(plan.columns()[2])
+    navigation = sum(
+        actions.count(action)
+        for action in KEY_DELAYS
+        if action != KeyAction.DELETE
+    )
+    report = UpdateReport(
+        edits=len(edits),
+        deleted=sum(edit.old_end - edit.old_start for edit in edits),
+        inserted=sum(edit.new_end - edit.new_start for edit in edits),
+        navigation=navigation,
+        keystrokes=len(plan),
+        duration=plan.duration,
+        full_keystrokes=len(full),
+        full_duration=full.duration,
+    )
+    return plan, report
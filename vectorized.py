@@ -0,0 +1,206 @@
+"""
+Phantom Keys - Vectorised Planner
+
+Builds seeded keystroke plans with NumPy array operations instead of a
+per-character Python loop. NumPy is only needed for seeded plans.
+
+Author: Neel
+License: MIT
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from engine import KeyAction, KeystrokePlan, SeedDraw
+
+if TYPE_CHECKING:
+    from engine import TypingEngine
+
+
+@dataclass
+class _PlanState:
+    """What one block of text hands on to the next."""
+
+    in_word: bool = False
+    in_blank: bool = False
+    fatigue: float = 1.0
+    word_scale: float = 1.0
+    last_time: float = 0.0
+    last_delay: float = 0.0
+    has_events: bool = False
+
+
+def _classify(engine: TypingEngine, codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Classify every distinct character once: whitespace flags and complexity."""
+    size = int(codes.max()) + 1
+    is_space = np.zeros(size, dtype=bool)
+    complexity = np.ones(size)
+    for code in np.flatnonzero(np.bincount(codes, minlength=size)).tolist():
+        char = chr(code)
+        is_space[code] = char.isspace()
+        complexity[code] = engine._char_complexity(char)
+    return is_space[codes], complexity[codes]
+
+
+def _plan_block(
+    engine: TypingEngine,
+    text: str,
+    start: int,
+    draws: np.ndarray,
+    settings: tuple[float, float, float, bool, int],
+    state: _PlanState,
+) -> tuple[np.ndarray, ...]:
+    """Plan the events for ``text``, which begins at offset ``start``."""
+    base_delay, typo_rate, variability, burst_mode, fatigue_span = settings
+    n = len(text)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.int64)
+
+    is_space, complexity = _classify(engine, codes)
+    is_newline = codes == 10
+    is_blank = is_space & ~is_newline
+    is_word = ~is_space
+
+    # A word starts at any non-space character that follows whitespace (or
+    # the start of the text); a run of blanks starts the same way.
+    follows_word = np.empty(n, dtype=bool)
+    follows_word[0] = state.in_word
+    follows_word[1:] = is_word[:-1]
+    word_start = is_word & ~follows_word
+    follows_blank = np.empty(n, dtype=bool)
+    follows_blank[0] = state.in_blank
+    follows_blank[1:] = is_blank[:-1]
+
+    typo = is_word & (draws[:, SeedDraw.TYPO] < typo_rate)
+
+    # Events per character: Enter for a newline, one press for a blank, and
+    # [typo, Backspace] plus the character itself for a word character.
+    counts = (is_newline | is_blank).astype(np.int64)
+    counts += is_word * (1 + 2 * typo)
+    first_event = np.cumsum(counts) - counts
+    total = int(counts.sum())
+
+    offsets = np.empty(total, dtype=np.uint32)
+    actions = np.empty(total, dtype=np.uint8)
+    keys = np.empty(total, dtype=np.uint32)
+    delays = np.empty(total)
+
+    # Per-word fatigue and burst scaling. Index 0 holds the word carried
+    # over from the previous block, so ``word_index`` can address both.
+    starts = np.flatnonzero(word_start)
+    fatigue = np.empty(len(starts) + 1)
+    fatigue[0] = state.fatigue
+    fatigue[1:] = 1 + np.minimum((starts + start) / fatigue_span, 1.0) * 0.15
+    burst = burst_mode & (draws[starts, SeedDraw.BURST] < 0.15)
+    word_scale = np.empty(len(starts) + 1)
+    word_scale[0] = state.word_scale
+    word_scale[1:] = np.where(burst, 0.6, 1.0) * fatigue[1:]
+    word_index = np.cumsum(word_start)
+
+    newlines = np.flatnonzero(is_newline)
+    slots = first_event[newlines]
+    offsets[slots] = newlines + start
+    actions[slots] = KeyAction.ENTER
+    keys[slots] = KeystrokePlan.PRESS_CODES[KeyAction.ENTER]
+    delays[slots] = 0.8 + (1.8 - 0.8) * draws[newlines, SeedDraw.ENTER]
+
+    blanks = np.flatnonzero(is_blank)
+    slots = first_event[blanks]
+    offsets[slots] = blanks + start
+    is_space_key = codes[blanks] == 32
+    actions[slots] = np.where(is_space_key, KeyAction.SPACE, KeyAction.CHAR)
+    keys[slots] = np.where(
+        is_space_key, KeystrokePlan.PRESS_CODES[KeyAction.SPACE], codes[blanks]
+    )
+    # The first blank after a word is the pause between words; the rest of
+    # the run, usually indentation, follows quickly.
+    space_draw = draws[blanks, SeedDraw.SPACE]
+    spacing = np.where(
+        follows_blank[blanks], 0.4 + (0.8 - 0.4) * space_draw, 1.5 + (2.5 - 1.5) * space_draw
+    )
+    delays[slots] = base_delay * spacing * fatigue[word_index[blanks]]
+
+    typos = np.flatnonzero(typo)
+    slots = first_event[typos]
+    offsets[slots] = typos + start
+    actions[slots] = KeyAction.TYPO
+    keys[slots] = [
+        ord(engine._seeded_typo_char(text[index], draw))
+        for index, draw in zip(typos.tolist(), draws[typos, SeedDraw.TYPO_CHAR].tolist())
+    ]
+    delays[slots] = 0.15 + (0.35 - 0.15) * draws[typos, SeedDraw.TYPO_HOLD]
+    offsets[slots + 1] = typos + start
+    actions[slots + 1] = KeyAction.BACKSPACE
+    keys[slots + 1] = KeystrokePlan.PRESS_CODES[KeyAction.BACKSPACE]
+    delays[slots + 1] = 0.05 + (0.12 - 0.05) * draws[typos, SeedDraw.BACKSPACE]
+
+    words = np.flatnonzero(is_word)
+    slots = first_event[words] + 2 * typo[words]
+    offsets[slots] = words + start
+    actions[slots] = KeyAction.CHAR
+    keys[slots] = codes[words]
+    jitter = 2 * draws[words, SeedDraw.JITTER] - 1
+    delay = base_delay * complexity[words] * (1 + variability * jitter)
+    think = draws[words, SeedDraw.THINK] < 0.02
+    delay[think] += 0.1 + (0.3 - 0.1) * draws[words[think], SeedDraw.THINK_LENGTH]
+    delays[slots] = delay * word_scale[word_index[words]]
+
+    # Each event happens once all earlier delays have elapsed. The running
+    # sum continues from the previous block's last event and adds one delay
+    # at a time, exactly like the scalar planner.
+    times = np.empty(total)
+    if total:
+        times[0] = state.last_time + state.last_delay if state.has_events else 0.0
+        times[1:] = delays[:-1]
+        np.cumsum(times, out=times)
+
+    state.in_word = bool(is_word[-1])
+    state.in_blank = bool(is_blank[-1])
+    state.fatigue = float(fatigue[-1])
+    state.word_scale = float(word_scale[-1])
+    if total:
+        state.last_time = float(times[-1])
+        state.last_delay = float(delays[-1])
+        state.has_events = True
+    return times, keys, actions, offsets
+
+
+def build_plan_vectorized(
+    engine: TypingEngine,
+    text: str,
+    wpm: int,
+    typo_rate: float,
+    variability: float,
+    burst_mode: bool,
+    seed: int,
+) -> KeystrokePlan:
+    """
+    Build the same plan as the seeded scalar planner, using array operations.
+
+    The text is planned in blocks of ``SeedDraw.BLOCK_SIZE`` characters:
+    each block is classified at once, its draws are taken from the seeded
+    generator in one call, and every event's delay is computed column-wise.
+    """
+    generator = np.random.default_rng(seed)
+    fatigue_span = len(text) or engine.FATIGUE_SPAN
+    settings = (60.0 / (wpm * 5), typo_rate, variability, burst_mode, fatigue_span)
+    state = _PlanState()
+    columns: list[tuple[np.ndarray, ...]] = []
+    for start in range(0, len(text), SeedDraw.BLOCK_SIZE):
+        block = text[start : start + SeedDraw.BLOCK_SIZE]
+        draws = generator.random((len(block), SeedDraw.COUNT))
+        columns.append(_plan_block(engine, block, start, draws, settings, state))
+
+    plan_columns = []
+    for typecode, parts in zip(("d", "I", "B", "I"), zip(*columns)):
+        column = array(typecode)
+        for part in parts:
+            column.frombytes(part.tobytes())
+        plan_columns.append(column)
+    if not plan_columns:
+        plan_columns = [array("d"), array("I"), array("B"), array("I")]
+    return KeystrokePlan(*plan_columns, total_chars=len(text))